@@ -0,0 +1,197 @@
+"""Micro-benchmarks for SciCheck Agent hot paths.
+
+Usage:
+    python benchmarks.py               # run every benchmark
+    python benchmarks.py claim-lookup  # run one benchmark
+    python benchmarks.py normalize     # text normalization throughput
+    python benchmarks.py articles      # article extraction (ARTICLE_CORPUS_DIR=dir of *.html to use real pages)
+
+Benchmarks run against a throwaway SQLite database and never call external APIs.
+"""
+import glob
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="scicheck-bench-")
+os.environ.setdefault("SCICHECK_DB_PATH", os.path.join(_tmpdir, "sessions.db"))
+os.environ.setdefault("WHISPER_API_KEY", "benchmark")
+
+import db  # noqa: E402  (environment must be prepared before import)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def report_latency(label, samples):
+    print(f"{label:<48} p50={percentile(samples, 50) * 1000:8.3f} ms  "
+          f"p99={percentile(samples, 99) * 1000:8.3f} ms  n={len(samples)}")
+
+
+def time_calls(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def seed_analysis(claim_count=20):
+    """Create an analysis whose claims all have model and external cache entries"""
+    analysis_id = db.new_analysis_id()
+    conn = db.get_db()
+    conn.execute("INSERT INTO analyses (analysis_id, mode) VALUES (?, ?)", (analysis_id, "General Analysis of Testable Claims"))
+    conn.commit()
+    claims = [f"Benchmark claim number {i} states that caffeine improves short-term memory recall." for i in range(claim_count)]
+    db.save_claims_for_analysis(analysis_id, claims)
+    for claim_text in claims:
+        ch = db.sha256_str(claim_text.strip().lower())
+        db.store_model_cache(ch, "Verdict: **INCONCLUSIVE**\n\nJustification: Benchmark.",
+                             ["Does caffeine dose matter?", "Is the effect age dependent?"], ["caffeine", "memory"])
+        db.store_external_cache(ch, "Mixed evidence.", [{"title": "Caffeine and memory", "url": "https://example.org/1"}])
+    return analysis_id, claim_count
+
+
+def bench_claim_lookup(iterations=5000):
+    """Warm cache-hit latency of /api/get-claim-details and /api/verify-external"""
+    analysis_id, claim_count = seed_analysis()
+    next_ordinal = itertools.cycle(range(claim_count)).__next__
+
+    def clear_lrus():
+        for cache in (db.CLAIM_LRU, db.MODEL_LRU, db.EXTERNAL_LRU):
+            cache.clear()
+
+    def joined_query():
+        clear_lrus()
+        db.lookup_claim_bundle(analysis_id, next_ordinal())
+
+    def lru_hit():
+        db.lookup_claim_bundle(analysis_id, next_ordinal())
+
+    report_latency("lookup_claim_bundle (joined query, LRU cold)", time_calls(joined_query, iterations))
+    report_latency("lookup_claim_bundle (LRU warm)", time_calls(lru_hit, iterations))
+
+    client = db.app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session["analysis_id"] = analysis_id
+        flask_session["mode"] = "General Analysis of Testable Claims"
+
+    for endpoint in ("/api/get-claim-details", "/api/verify-external"):
+        samples = time_calls(
+            lambda: client.post(endpoint, json={"claim_idx": next_ordinal()}),
+            iterations)
+        report_latency(f"POST {endpoint} (warm hit)", samples)
+
+
+def sample_report(paragraphs=400):
+    """A long report mixing plain ASCII with the characters the normalizers rewrite"""
+    paragraph = (
+        "The study’s authors report a “significant” effect (p ≤ 0.05, n ≈ 1200) "
+        "at 37°C ± 0.5 — with α = 0.05 and β ≈ 0.2. <b>Note:</b> "
+        "results for μ-opioid receptors were inconclusive.<br/>Further trials are needed "
+        "before recommending a dose of 200 mg to adults over 65 years old.\n\n"
+    )
+    return paragraph * paragraphs
+
+
+def report_throughput(label, text, samples):
+    megabytes = len(text.encode("utf-8")) / 1e6
+    best = min(samples)
+    print(f"{label:<48} {megabytes / best:8.1f} MB/s  (best of {len(samples)}, {megabytes:.2f} MB)")
+
+
+def bench_normalize(iterations=20):
+    """Throughput of the display/PDF text normalizers on long reports"""
+    text = sample_report()
+    ascii_text = text.encode("ascii", "ignore").decode("ascii")
+    report_throughput("normalize_text_for_display (mixed)", text,
+                      time_calls(lambda: db.normalize_text_for_display(text), iterations))
+    report_throughput("normalize_text_for_display (ASCII)", ascii_text,
+                      time_calls(lambda: db.normalize_text_for_display(ascii_text), iterations))
+    report_throughput("normalize_text_for_pdf (mixed)", text,
+                      time_calls(lambda: db.normalize_text_for_pdf(text), iterations))
+    report_throughput("clean_html_for_reportlab (mixed)", text,
+                      time_calls(lambda: db.clean_html_for_reportlab(text), iterations))
+
+
+def synthetic_news_page(seed, paragraphs=40):
+    """A large news-style page: navigation, scripts, sidebar, comments and one long article"""
+    rng = random.Random(seed)
+    words = ("study researchers found evidence that caffeine memory recall adults trial placebo "
+             "significant effect participants results suggest however further data sample").split()
+
+    def sentence():
+        return " ".join(rng.choice(words) for _ in range(rng.randint(8, 20))).capitalize() + ", reportedly."
+
+    nav = "".join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(60))
+    scripts = "".join(f"<script>var tracker{i} = {{id: {i}, payload: '{'x' * 400}'}};</script>" for i in range(30))
+    article = "".join(f"<p>{' '.join(sentence() for _ in range(4))}</p>" for _ in range(paragraphs))
+    sidebar = "".join(f'<div class="promo"><a href="/p/{i}">{sentence()}</a></div>' for i in range(40))
+    comments = "".join(f'<div class="comment"><p>{sentence()}</p></div>' for _ in range(80))
+    return (f"<html><head><title>News</title>{scripts}</head><body>"
+            f"<header><nav><ul>{nav}</ul></nav></header>"
+            f'<div class="layout"><main><article><h1>Headline {seed}</h1>{article}</article></main>'
+            f'<aside class="sidebar">{sidebar}</aside></div>'
+            f'<section id="comments">{comments}</section><footer>{nav}</footer></body></html>')
+
+
+def load_article_corpus():
+    corpus_dir = os.getenv("ARTICLE_CORPUS_DIR")
+    if corpus_dir:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(corpus_dir, "*.html"))):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+        if pages:
+            return pages, f"{len(pages)} pages from {corpus_dir}"
+    pages = [synthetic_news_page(seed) for seed in range(20)]
+    return pages, f"{len(pages)} synthetic news pages (set ARTICLE_CORPUS_DIR for real ones)"
+
+
+def bench_articles(rounds=3):
+    """Per-page latency and extracted length of each article extractor over a corpus"""
+    pages, description = load_article_corpus()
+    size_kb = sum(len(page) for page in pages) / len(pages) / 1024
+    print(f"corpus: {description}, {size_kb:.0f} KB/page on average")
+
+    extractors = [("parse_article_html_bs4 (previous)", db.parse_article_html_bs4)]
+    if db.lxml_html is not None:
+        extractors.append(("extract_article_lxml", db.extract_article_lxml))
+    if db.trafilatura is not None:
+        extractors.append(("trafilatura.extract",
+                           lambda html: db.trafilatura.extract(html, **db.TRAFILATURA_OPTIONS) or ""))
+    extractors.append(("parse_article_html (chain)", db.parse_article_html))
+
+    for label, extract in extractors:
+        samples, lengths = [], []
+        for _ in range(rounds):
+            for page in pages:
+                start = time.perf_counter()
+                text = extract(page)
+                samples.append(time.perf_counter() - start)
+                lengths.append(len(text))
+        report_latency(label, samples)
+        print(f"{'':<48} mean extracted length {sum(lengths) / len(lengths):8.0f} chars")
+
+
+BENCHMARKS = {
+    "claim-lookup": bench_claim_lookup,
+    "normalize": bench_normalize,
+    "articles": bench_articles,
+}
+
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        if name not in BENCHMARKS:
+            sys.exit(f"Unknown benchmark '{name}'. Choose from: {', '.join(BENCHMARKS)}")
+        print(f"== {name}")
+        BENCHMARKS[name]()
@@ -1,14 +1,16 @@
-from flask import Flask, request, render_template, send_file, Response, session, jsonify, redirect, url_for
+from flask import Flask, Request, request, render_template, Response, session, jsonify, redirect, url_for, g
 from dotenv import load_dotenv
 import os
 import requests
-import io
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 from urllib.parse import quote_plus
-from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import Paragraph, Table, TableStyle
+from reportlab.lib.enums import TA_CENTER
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 import logging
@@ -16,15 +18,30 @@ import re
 import uuid
 import time
 from bs4 import BeautifulSoup
+try:
+    from lxml import html as lxml_html
+except ImportError:  # optional: faster article extraction
+    lxml_html = None
+try:
+    import trafilatura
+except ImportError:  # optional: fast-path article extraction
+    trafilatura = None
 import sqlite3
 from datetime import datetime, timedelta
-import base64
-from PIL import Image
-import pytesseract
-from moviepy.editor import VideoFileClip
+from ocr_worker import OCR_DEFAULT_OEM, OCR_DEFAULT_PSM, ocr_image_file
 import yt_dlp
 import unicodedata
 import hashlib
+import inspect
+import shutil
+import subprocess
+import tempfile
+from xml.sax.saxutils import escape as xml_escape
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -54,9 +71,94 @@ def json_loads(s: str, fallback):
 def new_analysis_id() -> str:
     return str(uuid.uuid4())
 
+def report_hash(claim_text: str, question_text: str) -> str:
+    return sha256_str(claim_text.strip().lower() + "||" + question_text.strip().lower())
+
+def sql_in_chunks(values, size=500):
+    """Split values for 'IN (...)' queries, yielding (placeholders, chunk) pairs"""
+    values = list(values)
+    for i in range(0, len(values), size):
+        chunk = values[i:i + size]
+        yield ",".join("?" * len(chunk)), chunk
+
+class LRUCache:
+    """Bounded, thread-safe least-recently-used map whose entries expire ttl seconds after put()"""
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard_where(self, predicate):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+# In-process caches of decoded lookups in front of SQLite. Other worker processes write and
+# clean up the same tables, so entries expire and are re-read instead of living forever.
+LOOKUP_LRU_TTL_SECONDS = float(os.getenv("LOOKUP_LRU_TTL_SECONDS", "30"))
+CLAIM_LRU = LRUCache(4096, ttl=LOOKUP_LRU_TTL_SECONDS)     # (analysis_id, ordinal) -> (claim_text, claim_hash)
+MODEL_LRU = LRUCache(4096, ttl=LOOKUP_LRU_TTL_SECONDS)     # claim_hash -> decoded model_cache row
+EXTERNAL_LRU = LRUCache(4096, ttl=LOOKUP_LRU_TTL_SECONDS)  # claim_hash -> decoded external_cache row
+
+# SQLite connection management: one long-lived, tuned connection per thread
+DB_PATH = os.getenv("SCICHECK_DB_PATH", '/home/scicheckagent/mysite/sessions.db')
+SQLITE_BUSY_TIMEOUT_MS = 5000
+SQLITE_CACHE_SIZE_KB = 16384          # page cache per connection
+SQLITE_MMAP_SIZE = 128 * 1024 * 1024  # memory-mapped reads
+
+_db_local = threading.local()
+
+def get_db():
+    """Return this thread's SQLite connection, opening and configuring it on first use"""
+    conn = getattr(_db_local, "conn", None)
+    # A forked child (e.g. a process pool worker) must not reuse its parent's connection
+    if conn is None or _db_local.pid != os.getpid():
+        conn = sqlite3.connect(DB_PATH, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        _db_local.conn = conn
+        _db_local.pid = os.getpid()
+    return conn
+
+@app.teardown_request
+def rollback_open_transaction(exc):
+    """Never leave a write transaction open on a reused connection after a failed request"""
+    conn = getattr(_db_local, "conn", None)
+    if conn is not None and _db_local.pid == os.getpid() and conn.in_transaction:
+        conn.rollback()
+
 # Database setup for normalized storage
 def init_db():
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
+    conn = get_db()
     c = conn.cursor()
 
     # Workspace pointer only
@@ -78,6 +180,17 @@ def init_db():
     )
     """)
 
+    # Extraction cache (normalized text + mode + prompt -> parsed claims list)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS extraction_cache (
+        cache_key TEXT PRIMARY KEY,
+        text_hash TEXT NOT NULL,
+        mode TEXT NOT NULL,
+        claims_json TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
     # Article cache (URL -> text)
     c.execute("""
     CREATE TABLE IF NOT EXISTS article_cache (
@@ -148,64 +261,376 @@ def init_db():
     )
     """)
 
+    # Materialized report availability: which questions of a claim have a cached report
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS report_availability (
+        claim_hash TEXT NOT NULL,
+        question_idx INTEGER NOT NULL,
+        rq_hash TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (claim_hash, question_idx)
+    )
+    """)
+
+    # Which claims each cached PDF export was rendered from (for invalidation)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS pdf_cache_deps (
+        cache_key TEXT NOT NULL,
+        claim_hash TEXT NOT NULL,
+        PRIMARY KEY (cache_key, claim_hash)
+    )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_pdf_cache_deps_claim ON pdf_cache_deps(claim_hash)")
+
+    # Background jobs (video transcription); results land in media_cache under media_key
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        media_key TEXT NOT NULL,
+        status TEXT NOT NULL,
+        progress TEXT,
+        error TEXT,
+        payload_json TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    job_columns = {row[1] for row in c.execute("PRAGMA table_info(jobs)")}
+    if "payload_json" not in job_columns:
+        c.execute("ALTER TABLE jobs ADD COLUMN payload_json TEXT")
+    if "attempts" not in job_columns:
+        c.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_media ON jobs(media_key, status)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+
+    # Leases for single-flight work shared across worker processes
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS inflight_leases (
+        lease_key TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    """)
+
+    # One-off data migrations, tracked in the database's user_version
+    if c.execute("PRAGMA user_version").fetchone()[0] < 1:
+        backfill_report_availability(c)
+        c.execute("PRAGMA user_version = 1")
+
     conn.commit()
-    conn.close()
+
+def backfill_report_availability(c):
+    """Index every (claim, question) report cached before report_availability existed"""
+    c.execute("""
+    SELECT m.claim_hash, m.questions_json,
+           (SELECT claim_text FROM claims WHERE claims.claim_hash = m.claim_hash LIMIT 1)
+    FROM model_cache m
+    WHERE EXISTS (SELECT 1 FROM claims WHERE claims.claim_hash = m.claim_hash)
+    """)
+    candidates = {}
+    for claim_hash, questions_json, claim_text in c.fetchall():
+        for q_idx, question in enumerate(json_loads(questions_json, [])):
+            candidates[report_hash(claim_text, question)] = (claim_hash, q_idx)
+    found = set()
+    for placeholders, chunk in sql_in_chunks(candidates):
+        c.execute(f"SELECT rq_hash FROM report_cache WHERE rq_hash IN ({placeholders})", chunk)
+        found.update(row[0] for row in c.fetchall())
+    c.executemany("""
+    INSERT OR IGNORE INTO report_availability (claim_hash, question_idx, rq_hash)
+    VALUES (?, ?, ?)
+    """, [(*candidates[rq_hash], rq_hash) for rq_hash in found])
+    if found:
+        logging.info(f"Backfilled report availability for {len(found)} cached reports")
+
+def insert_claim(c, analysis_id: str, idx: int, claim_text: str):
+    claim_hash = sha256_str(claim_text.strip().lower())
+    claim_id = sha256_str(f"{analysis_id}|{idx}|{claim_text.strip()}")
+    c.execute("""
+    INSERT OR REPLACE INTO claims (claim_id, analysis_id, ordinal, claim_text, claim_hash)
+    VALUES (?, ?, ?, ?, ?)
+    """, (claim_id, analysis_id, idx, claim_text.strip(), claim_hash))
 
 def save_claims_for_analysis(analysis_id: str, claims_list: list):
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
+    conn = get_db()
     c = conn.cursor()
     c.execute("DELETE FROM claims WHERE analysis_id=?", (analysis_id,))
+    CLAIM_LRU.discard_where(lambda key: key[0] == analysis_id)
 
     for idx, claim_text in enumerate(claims_list):
-        claim_hash = sha256_str(claim_text.strip().lower())
-        claim_id = sha256_str(f"{analysis_id}|{idx}|{claim_text.strip()}")
-        c.execute("""
-        INSERT OR REPLACE INTO claims (claim_id, analysis_id, ordinal, claim_text, claim_hash)
-        VALUES (?, ?, ?, ?, ?)
-        """, (claim_id, analysis_id, idx, claim_text.strip(), claim_hash))
+        insert_claim(c, analysis_id, idx, claim_text)
+
+    conn.commit()
 
+def add_claim_to_analysis(analysis_id: str, idx: int, claim_text: str):
+    """Persist one claim as soon as it is extracted (streaming analysis)"""
+    conn = get_db()
+    insert_claim(conn.cursor(), analysis_id, idx, claim_text)
     conn.commit()
-    conn.close()
 
 def get_claims_for_analysis(analysis_id: str):
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
+    conn = get_db()
     c = conn.cursor()
     c.execute("SELECT claim_text FROM claims WHERE analysis_id=? ORDER BY ordinal", (analysis_id,))
     rows = c.fetchall()
-    conn.close()
     return [row[0] for row in rows]
 
 def compute_file_hash(file_path):
     """Compute SHA256 hash of a file"""
     hash_sha256 = hashlib.sha256()
     with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
             hash_sha256.update(chunk)
     return hash_sha256.hexdigest()
 
 def get_cached_media(file_hash):
     """Get cached media extraction result"""
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
+    conn = get_db()
     c = conn.cursor()
     c.execute('SELECT extracted_text FROM media_cache WHERE file_hash = ?', (file_hash,))
     result = c.fetchone()
-    conn.close()
     return result[0] if result else None
 
 def store_media_cache(file_hash, media_type, extracted_text):
     """Store media extraction result in cache"""
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
+    conn = get_db()
     c = conn.cursor()
     c.execute("""
     INSERT OR REPLACE INTO media_cache (file_hash, media_type, extracted_text)
     VALUES (?, ?, ?)
     """, (file_hash, media_type, extracted_text))
     conn.commit()
-    conn.close()
+
+def store_model_cache(claim_hash, verdict, questions, keywords):
+    """Store model verdict, questions and keywords for a claim"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute("""
+    INSERT INTO model_cache (claim_hash, verdict, questions_json, keywords_json, updated_at)
+    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(claim_hash) DO UPDATE SET
+    verdict=excluded.verdict,
+    questions_json=excluded.questions_json,
+    keywords_json=excluded.keywords_json,
+    updated_at=CURRENT_TIMESTAMP
+    """, (claim_hash, verdict, json_dumps(questions or []), json_dumps(keywords or [])))
+    invalidate_pdf_cache(claim_hash)
+    conn.commit()
+    MODEL_LRU.put(claim_hash, {"model_verdict": verdict, "questions": questions or [], "search_keywords": keywords or []})
+
+def store_external_cache(claim_hash, verdict, sources):
+    """Store external verdict and sources for a claim"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute("""
+    INSERT INTO external_cache (claim_hash, verdict, sources_json, updated_at)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(claim_hash) DO UPDATE SET
+    verdict=excluded.verdict,
+    sources_json=excluded.sources_json,
+    updated_at=CURRENT_TIMESTAMP
+    """, (claim_hash, verdict, json_dumps(sources)))
+    invalidate_pdf_cache(claim_hash)
+    conn.commit()
+    EXTERNAL_LRU.put(claim_hash, {"verdict": verdict, "sources": sources})
+
+def store_report_cache(rq_hash, question_text, report_text, claim_hash, question_idx):
+    """Store a research report and mark it available for its claim/question"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute("""
+    INSERT OR REPLACE INTO report_cache
+    (rq_hash, question_text, report_text, updated_at)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    """, (rq_hash, question_text, report_text))
+    c.execute("""
+    INSERT OR REPLACE INTO report_availability (claim_hash, question_idx, rq_hash, updated_at)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    """, (claim_hash, question_idx, rq_hash))
+    invalidate_pdf_cache(claim_hash)
+    conn.commit()
+
+def get_extraction_cache(cache_key):
+    """Cached claims list for an extraction cache key, or None"""
+    c = get_db().cursor()
+    c.execute("SELECT claims_json FROM extraction_cache WHERE cache_key=?", (cache_key,))
+    row = c.fetchone()
+    return json_loads(row[0], None) if row else None
+
+def store_extraction_cache(cache_key, text_hash, text, mode, claims_list):
+    """Store an extraction result together with the text it was extracted from"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute("INSERT OR IGNORE INTO pasted_texts (text_hash, text_content) VALUES (?, ?)", (text_hash, text))
+    c.execute("""
+    INSERT OR REPLACE INTO extraction_cache (cache_key, text_hash, mode, claims_json, created_at)
+    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+    """, (cache_key, text_hash, mode, json_dumps(claims_list)))
+    conn.commit()
+
+def get_model_cache(claim_hash):
+    """Decoded model_cache entry for a claim, or None"""
+    hit = MODEL_LRU.get(claim_hash)
+    if hit is not None:
+        return hit
+    c = get_db().cursor()
+    c.execute("SELECT verdict, questions_json, keywords_json FROM model_cache WHERE claim_hash=?", (claim_hash,))
+    row = c.fetchone()
+    if not row:
+        return None
+    hit = {"model_verdict": row[0], "questions": json_loads(row[1], []), "search_keywords": json_loads(row[2], [])}
+    MODEL_LRU.put(claim_hash, hit)
+    return hit
+
+def get_external_cache(claim_hash):
+    """Decoded external_cache entry for a claim, or None"""
+    hit = EXTERNAL_LRU.get(claim_hash)
+    if hit is not None:
+        return hit
+    c = get_db().cursor()
+    c.execute("SELECT verdict, sources_json FROM external_cache WHERE claim_hash=?", (claim_hash,))
+    row = c.fetchone()
+    if not row:
+        return None
+    hit = {"verdict": row[0], "sources": json_loads(row[1], [])}
+    EXTERNAL_LRU.put(claim_hash, hit)
+    return hit
+
+def lookup_claim_bundle(analysis_id, ordinal, need=("model", "external")):
+    """Claim text plus its cached model/external results, from memory or one joined query.
+
+    Returns None if the claim does not exist; missing cache entries come back as None.
+    """
+    claim = CLAIM_LRU.get((analysis_id, ordinal))
+    if claim is not None:
+        claim_text, claim_hash = claim
+        bundle = {
+            "claim_text": claim_text,
+            "claim_hash": claim_hash,
+            "model": MODEL_LRU.get(claim_hash),
+            "external": EXTERNAL_LRU.get(claim_hash),
+        }
+        if all(bundle[part] is not None for part in need):
+            return bundle
+
+    c = get_db().cursor()
+    c.execute("""
+    SELECT c.claim_text, c.claim_hash, m.verdict, m.questions_json, m.keywords_json, e.verdict, e.sources_json
+    FROM claims c
+    LEFT JOIN model_cache m ON m.claim_hash = c.claim_hash
+    LEFT JOIN external_cache e ON e.claim_hash = c.claim_hash
+    WHERE c.analysis_id=? AND c.ordinal=?
+    """, (analysis_id, ordinal))
+    row = c.fetchone()
+    if not row:
+        return None
+
+    claim_text, claim_hash = row[0], row[1]
+    CLAIM_LRU.put((analysis_id, ordinal), (claim_text, claim_hash))
+    bundle = {"claim_text": claim_text, "claim_hash": claim_hash, "model": None, "external": None}
+    if row[2] is not None:
+        bundle["model"] = {"model_verdict": row[2], "questions": json_loads(row[3], []), "search_keywords": json_loads(row[4], [])}
+        MODEL_LRU.put(claim_hash, bundle["model"])
+    if row[5] is not None:
+        bundle["external"] = {"verdict": row[5], "sources": json_loads(row[6], [])}
+        EXTERNAL_LRU.put(claim_hash, bundle["external"])
+    return bundle
+
+# Single-flight: concurrent requests for the same claim wait on one computation
+SINGLE_FLIGHT_LEASE_SECONDS = 180
+SINGLE_FLIGHT_POLL_INTERVAL = 0.5
+# Longest compute a follower waits for: three verdict attempts plus a questions call, 90 s each
+SINGLE_FLIGHT_COMPUTE_SECONDS = 4 * 90
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def acquire_lease(lease_key, owner, lease_seconds=SINGLE_FLIGHT_LEASE_SECONDS):
+    """Try to take the cross-process lease for a piece of work. Expired leases are taken over."""
+    now = time.time()
+    conn = get_db()
+    c = conn.cursor()
+    c.execute("DELETE FROM inflight_leases WHERE lease_key=? AND expires_at < ?", (lease_key, now))
+    c.execute("INSERT OR IGNORE INTO inflight_leases (lease_key, owner, expires_at) VALUES (?, ?, ?)",
+              (lease_key, owner, now + lease_seconds))
+    acquired = c.rowcount == 1
+    conn.commit()
+    return acquired
+
+def release_lease(lease_key, owner):
+    """Release a lease held by owner"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute("DELETE FROM inflight_leases WHERE lease_key=? AND owner=?", (lease_key, owner))
+    conn.commit()
+
+def new_lease_owner() -> str:
+    return f"{os.getpid()}:{uuid.uuid4()}"
+
+def wait_for_lease_or_result(lease_key, owner, lookup, lease_seconds=SINGLE_FLIGHT_LEASE_SECONDS):
+    """Wait until either lookup() finds a result another worker produced, or we hold the lease.
+
+    Returns (result, holds_lease). If the lease is never freed in time, returns (None, False)
+    and the caller should do the work itself.
+    """
+    deadline = time.monotonic() + lease_seconds
+    while True:
+        if acquire_lease(lease_key, owner, lease_seconds):
+            # Another worker may have finished between our cache miss and taking the lease
+            return lookup(), True
+        result = lookup()
+        if result is not None:
+            return result, False
+        if time.monotonic() >= deadline:
+            logging.warning(f"Timed out waiting for in-flight work on {lease_key}, computing it here")
+            return None, False
+        time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+
+def single_flight(key, lookup, compute, lease_seconds=SINGLE_FLIGHT_LEASE_SECONDS):
+    """Run compute() at most once at a time per key across threads and worker processes.
+
+    lookup() returns the stored result or None. Threads in this process share the leader's
+    result directly; other processes coordinate through a lease row and then read the cache.
+    A follower whose leader failed or ran out of time looks the result up and otherwise
+    computes it itself.
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _inflight[key] = future
+
+    if not is_leader:
+        try:
+            # The leader may wait out another process's lease before it starts computing
+            return future.result(timeout=lease_seconds + SINGLE_FLIGHT_COMPUTE_SECONDS)
+        except Exception as e:
+            logging.warning(f"In-flight work on {key} gave no result ({e!r}), retrying it here")
+        result = lookup()
+        return result if result is not None else compute()
+
+    owner = new_lease_owner()
+    holds_lease = False
+    try:
+        result, holds_lease = wait_for_lease_or_result(key, owner, lookup, lease_seconds)
+        if result is None:
+            result = compute()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        if holds_lease:
+            release_lease(key, owner)
+        with _inflight_lock:
+            _inflight.pop(key, None)
 
 def cleanup_old_cache():
     """Clean up old cache entries to prevent database bloat"""
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
+    conn = get_db()
     c = conn.cursor()
     try:
         # Clean up media cache older than 30 days
@@ -223,6 +648,11 @@ def cleanup_old_cache():
                  (datetime.now() - timedelta(days=30),))
         texts_deleted = c.rowcount
 
+        # Clean up extraction_cache older than 30 days
+        c.execute('DELETE FROM extraction_cache WHERE created_at < ?',
+                 (datetime.now() - timedelta(days=30),))
+        extractions_deleted = c.rowcount
+
         # Clean up article_cache older than 30 days
         c.execute('DELETE FROM article_cache WHERE fetched_at < ?',
                  (datetime.now() - timedelta(days=30),))
@@ -242,12 +672,19 @@ def cleanup_old_cache():
         c.execute('DELETE FROM report_cache WHERE updated_at < ?',
                  (datetime.now() - timedelta(days=90),))
         report_deleted = c.rowcount
+        c.execute('DELETE FROM report_availability WHERE rq_hash NOT IN (SELECT rq_hash FROM report_cache)')
+
+        # Clean up finished jobs older than 1 day
+        c.execute("DELETE FROM jobs WHERE updated_at < ? AND status IN ('completed', 'failed')",
+                 (datetime.now() - timedelta(days=1),))
 
         conn.commit()
-        logging.info(f"Cache cleanup completed: {media_deleted} media, {analyses_deleted} analyses, {texts_deleted} texts, {articles_deleted} articles, {model_deleted} model, {external_deleted} external, {report_deleted} reports removed")
+        for cache in (CLAIM_LRU, MODEL_LRU, EXTERNAL_LRU):
+            cache.clear()
+        logging.info(f"Cache cleanup completed: {media_deleted} media, {analyses_deleted} analyses, {texts_deleted} texts, {extractions_deleted} extractions, {articles_deleted} articles, {model_deleted} model, {external_deleted} external, {report_deleted} reports removed")
 
         # Optional: Run VACUUM if significant space was freed
-        if (media_deleted + analyses_deleted + texts_deleted + articles_deleted + model_deleted + external_deleted + report_deleted) > 50:
+        if (media_deleted + analyses_deleted + texts_deleted + extractions_deleted + articles_deleted + model_deleted + external_deleted + report_deleted) > 50:
             c.execute('VACUUM')
             logging.info("Database vacuum performed")
 
@@ -255,8 +692,6 @@ def cleanup_old_cache():
         logging.error(f"Cleanup error: {e}")
         conn.rollback()
         raise
-    finally:
-        conn.close()
 
 # Initialize database on startup
 init_db()
@@ -281,22 +716,33 @@ BASE_EXTRACTION_RULES = '''
 - Output ONLY the claims formatted as a numbered list, or "No explicit claims found."
 '''
 
-BASE_JSON_STRUCTURE = '''
-Output a structured text response with the following format. Do NOT use code fences (```), JSON, or extra text outside this structure. Use exact labels and colons.
+VERDICT_LABELS = (
+    "VERIFIED", "PARTIALLY_SUPPORTED", "INCONCLUSIVE", "CONTRADICTED", "SUPPORTED",
+    "NOT_SUPPORTED", "FEASIBLE", "POSSIBLE_BUT_UNPROVEN", "UNLIKELY", "NONSENSE",
+)
+
+# Verdict fields, shared by the single-claim and batched prompts
+VERDICT_JSON_EXAMPLE = '{"verdict": "VERIFIED", "justification": "Concise explanation under 1000 characters.", "sources": [], "keywords": ["term1", "term2", "term3"], "questions": ["Research question 1?", "Research question 2?", "Research question 3?"]}'
+
+VERDICT_FIELD_RULES = '''- verdict: Exactly one of VERIFIED, PARTIALLY_SUPPORTED, INCONCLUSIVE, CONTRADICTED, SUPPORTED, NOT_SUPPORTED, FEASIBLE, POSSIBLE_BUT_UNPROVEN, UNLIKELY, NONSENSE
+- justification: String, max 1000 characters
+- sources: 0-2 valid URLs, or an empty list if none
+- keywords: 3-5 scientific/technical terms, each 3-20 characters
+- questions: Up to 3 concise research questions that would help test the claim'''
+
+BASE_JSON_STRUCTURE = f'''
+Output a single JSON object with exactly the following keys. Do NOT use code fences (```) or extra text outside the JSON object.
 
-Verdict: VERIFIED
-Justification: Concise explanation under 1000 characters.
-Sources: None
-Keywords: term1, term2, term3, term4, term5
+{VERDICT_JSON_EXAMPLE}
 
 STRICT RULES:
-- Verdict: Exactly one of VERIFIED, PARTIALLY_SUPPORTED, INCONCLUSIVE, CONTRADICTED, SUPPORTED, NOT_SUPPORTED, FEASIBLE, POSSIBLE_BUT_UNPROVEN, UNLIKELY, NONSENSE
-- Justification: String, max 1000 characters
-- Sources: 0-2 valid URLs, comma-separated, or "None" if none
-- Keywords: 3-5 scientific/technical terms, comma-separated, each 3-20 characters
-- Output ONLY the structured text, nothing else
+{VERDICT_FIELD_RULES}
+- Output ONLY the JSON object, nothing else
 '''
 
+# Braces escaped for templates that are later filled with str.format()
+BASE_JSON_STRUCTURE_FMT = BASE_JSON_STRUCTURE.replace("{", "{{").replace("}", "}}")
+
 # Prompt templates
 extraction_templates = {
     "General Analysis of Testable Claims": f'''
@@ -336,22 +782,104 @@ OUTPUT:
 
 verification_prompts = {
     "General Analysis of Testable Claims": f'''
-Analyze this claim and return a structured text response. {BASE_JSON_STRUCTURE}
+Analyze this claim and return a structured response. {BASE_JSON_STRUCTURE_FMT}
 
 Claim: "{{claim}}"
 ''',
     "Specific Focus on Scientific Claims": f'''
-Analyze this scientific claim and return a structured text response. {BASE_JSON_STRUCTURE}
+Analyze this scientific claim and return a structured response. {BASE_JSON_STRUCTURE_FMT}
 
 Claim: "{{claim}}"
 ''',
     "Technology-Focused Extraction": f'''
-Evaluate this technology claim and return a structured text response. {BASE_JSON_STRUCTURE}
+Evaluate this technology claim and return a structured response. {BASE_JSON_STRUCTURE_FMT}
 
 Claim: "{{claim}}"
 '''
 }
 
+# Batched verification: several claims answered in one completion
+BATCH_MAX_CLAIMS = 8
+BATCH_MAX_PROMPT_CHARS = 12000
+
+batch_claim_kinds = {
+    "General Analysis of Testable Claims": "claim",
+    "Specific Focus on Scientific Claims": "scientific claim",
+    "Technology-Focused Extraction": "technology claim",
+}
+
+BATCH_ENTRY_EXAMPLE = '{"claim": 1, ' + VERDICT_JSON_EXAMPLE[1:]
+
+BATCH_VERIFICATION_PROMPT = '''
+Analyze each numbered {claim_kind} below independently.
+
+Output a single JSON object of the form {{"results": [...]}} with one entry per claim. Do NOT use code fences (```) or extra text outside the JSON object. Each entry looks like:
+
+{entry_example}
+
+STRICT RULES for each entry:
+- claim: The number of the claim the entry answers
+{field_rules}
+- Output ONLY the {{"results": [...]}} object, nothing else
+
+Claims:
+{claims}
+'''
+
+# Shared HTTP client: one keep-alive connection pool per host, reused by every integration
+HTTP_POOL_CONNECTIONS = 16  # number of distinct hosts kept pooled
+HTTP_POOL_MAXSIZE = 32      # concurrent keep-alive connections per host
+
+def build_http_session():
+    """Build a cookie-less requests Session with pooled keep-alive connections and retry/backoff"""
+    retry = Retry(
+        total=3,
+        connect=3,
+        read=2,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+    http = requests.Session()
+    # Shared by every user, including fetches of user-supplied URLs: never store or replay cookies
+    http.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    http.mount("https://", adapter)
+    http.mount("http://", adapter)
+    return http
+
+HTTP_SESSION = build_http_session()
+
+# External source lookups: per-provider minimum spacing between requests (seconds)
+PROVIDER_MIN_INTERVALS = {
+    "semantic_scholar": 1.1,
+    "crossref": 0.5,
+    "core": 0.5,
+    "pubmed": 0.34,
+}
+EXTERNAL_FETCH_DEADLINE = float(os.getenv("EXTERNAL_FETCH_DEADLINE", "12"))
+EXTERNAL_FETCH_MIN_BUDGET = 2.0  # a provider whose slot leaves less time than this is skipped
+
+_provider_next_slot = {}
+_provider_lock = threading.Lock()
+SOURCE_FETCH_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="source-fetch")
+
+def reserve_rate_limit_slot(provider, not_after, request_count=1):
+    """Reserve the provider's next request_count request slots without waiting.
+
+    Returns the monotonic time the first request may start, or None (reserving nothing) if
+    that is after not_after, so callers skip a backed-up provider instead of queueing on it.
+    """
+    interval = PROVIDER_MIN_INTERVALS.get(provider, 0)
+    with _provider_lock:
+        now = time.monotonic()
+        slot = max(now, _provider_next_slot.get(provider, 0))
+        if slot > not_after:
+            return None
+        _provider_next_slot[provider] = slot + interval * request_count
+    return slot
+
 # Helper functions
 def call_openrouter(prompt, stream=False, temperature=0.0, json_mode=False):
     """Calls the OpenRouter API, supports streaming and JSON mode."""
@@ -374,7 +902,7 @@ def call_openrouter(prompt, stream=False, temperature=0.0, json_mode=False):
         payload["response_format"] = {"type": "json_object"}
 
     try:
-        response = requests.post(OR_URL, headers=headers, json=payload, stream=stream, timeout=90)
+        response = HTTP_SESSION.post(OR_URL, headers=headers, json=payload, stream=stream, timeout=90)
         response.raise_for_status()
         return response
     except requests.exceptions.RequestException as e:
@@ -383,65 +911,340 @@ def call_openrouter(prompt, stream=False, temperature=0.0, json_mode=False):
             raise Exception(f"API Error {e.response.status_code}: {e.response.text}") from e
         raise Exception(f"Network or API connection error: {e}") from e
 
-def extract_article_from_url(url):
-    """Fetch and extract article content from a URL using direct requests and BeautifulSoup."""
+def iter_sse_events(response):
+    """Yield the data payload of each complete server-sent event in a streaming response.
+
+    Network chunks are buffered as bytes and only complete lines are decoded, so an event
+    (or a multi-byte UTF-8 character) split across chunks is reassembled instead of dropped.
+    """
+    buffer = bytearray()
+    data_lines = []
+    # chunk_size=None hands over data as it arrives instead of in fixed 1 KB slices
+    for chunk in response.iter_content(chunk_size=None):
+        if not chunk:
+            continue
+        buffer += chunk
+        if b"\n" not in chunk:
+            continue
+        *lines, tail = buffer.split(b"\n")
+        buffer = bytearray(tail)
+        for raw_line in lines:
+            line = raw_line.rstrip(b"\r").decode("utf-8", errors="replace")
+            if not line:
+                # A blank line terminates the event
+                if data_lines:
+                    yield "\n".join(data_lines)
+                    data_lines = []
+            elif line.startswith("data:"):
+                value = line[5:]
+                data_lines.append(value[1:] if value.startswith(" ") else value)
+            # Comments (": OPENROUTER PROCESSING") and event/id/retry fields are ignored
+
+    # Flush a final event the server did not terminate with a blank line
+    line = buffer.rstrip(b"\r").decode("utf-8", errors="replace")
+    if line.startswith("data:"):
+        value = line[5:]
+        data_lines.append(value[1:] if value.startswith(" ") else value)
+    if data_lines:
+        yield "\n".join(data_lines)
+
+def iter_completion_deltas(response):
+    """Yield the content deltas of a streaming chat completion until [DONE]"""
+    for data in iter_sse_events(response):
+        if data == "[DONE]":
+            return
+        try:
+            event = json.loads(data)
+        except json.JSONDecodeError:
+            logging.warning(f"Skipping malformed stream event: {data[:200]}")
+            continue
+        if event.get("error"):
+            raise Exception(f"Stream error from API: {event['error']}")
+        choices = event.get("choices") or []
+        if choices:
+            content = (choices[0].get("delta") or {}).get("content")
+            if content:
+                yield content
+
+# Article cache: pages are revalidated with conditional GETs once older than the TTL
+ARTICLE_CACHE_TTL = int(os.getenv("ARTICLE_CACHE_TTL", "3600"))
+ARTICLE_FETCH_HEADERS = {"User-Agent": "SciCheckAgent/1.0 (mailto:alizgravenil@gmail.com)"}
+
+# Article downloads are streamed and bounded so huge or non-HTML links cannot exhaust memory
+ARTICLE_MAX_BYTES = int(os.getenv("ARTICLE_MAX_BYTES", str(3 * 1024 * 1024)))
+ARTICLE_CHUNK_SIZE = 64 * 1024
+ARTICLE_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+try:
+    import brotli  # noqa: F401  (urllib3 decodes br responses when a brotli module is present)
+    ARTICLE_FETCH_HEADERS["Accept-Encoding"] = "gzip, deflate, br"
+except ImportError:
     try:
-        headers = {"User-Agent": "SciCheckAgent/1.0 (mailto:alizgravenil@gmail.com)"}
-        session = requests.Session()
-        logging.info(f"Fetching URL: {url}")
-        response = session.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
+        import brotlicffi  # noqa: F401
+        ARTICLE_FETCH_HEADERS["Accept-Encoding"] = "gzip, deflate, br"
+    except ImportError:
+        ARTICLE_FETCH_HEADERS["Accept-Encoding"] = "gzip, deflate"
+
+def get_cached_article(url_hash):
+    """Return the article_cache row for a URL hash as a dict (with age in seconds), or None"""
+    row = get_db().execute("""
+    SELECT raw_html, article_text, etag, last_modified,
+           (julianday('now') - julianday(fetched_at)) * 86400
+    FROM article_cache WHERE url_hash = ?
+    """, (url_hash,)).fetchone()
+    if not row:
+        return None
+    return dict(zip(("raw_html", "article_text", "etag", "last_modified", "age"), row))
+
+def store_article_cache(url_hash, url, raw_html, article_text, etag, last_modified):
+    """Store a fetched page, its extracted text and validators"""
+    conn = get_db()
+    conn.execute("""
+    INSERT OR REPLACE INTO article_cache (url_hash, url, raw_html, article_text, etag, last_modified, fetched_at)
+    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    """, (url_hash, url, raw_html, article_text, etag, last_modified))
+    conn.commit()
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Prioritize common article content selectors
-        content_selectors = [
-            'article',
-            '.article-body-commercial-selector',
-            'main',
-            '.article-content',
-            '.post-content',
-            '.entry-content',
-            'div[itemprop="articleBody"]',
-            'div[id*="content"]',
-            'div[class*="text"]'
-        ]
+def touch_article_cache(url_hash):
+    """Mark a cached page as freshly revalidated (after a 304)"""
+    conn = get_db()
+    conn.execute("UPDATE article_cache SET fetched_at = CURRENT_TIMESTAMP WHERE url_hash = ?", (url_hash,))
+    conn.commit()
 
-        text = ""
-        for selector in content_selectors:
-            elements = soup.select(selector)
-            if elements:
-                current_text = ' '.join(elem.get_text(separator=' ', strip=True) for elem in elements)
-                if len(current_text) > 200:
-                    logging.info(f"BeautifulSoup extracted {len(current_text)} characters using selector: {selector}")
-                    return current_text
-                elif len(current_text) > len(text):
-                    text = current_text
-
-        # Fallback if specific selectors didn't yield much
-        if len(text) > 50:
+def fetch_article_html(url, cached=None):
+    """GET a page, revalidating a cached copy. Returns (html, etag, last_modified), or None on 304."""
+    headers = dict(ARTICLE_FETCH_HEADERS)
+    if cached:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+    logging.info(f"Fetching URL: {url}")
+    response = HTTP_SESSION.get(url, headers=headers, timeout=15, stream=True)
+    try:
+        if response.status_code == 304 and cached:
+            return None
+        response.raise_for_status()
+        html = read_article_body(response)
+        return html, response.headers.get("ETag"), response.headers.get("Last-Modified")
+    finally:
+        response.close()
+
+def iter_response_chunks(response, chunk_size):
+    """Yield decompressed body chunks as they arrive (gzip/deflate, and br when brotli is installed).
+
+    urllib3 2's read1 returns whatever is available instead of blocking until a full chunk
+    has been received, so the caller stops at its size limit without reading past it.
+    """
+    raw = response.raw
+    if not hasattr(raw, "read1"):
+        yield from response.iter_content(chunk_size=chunk_size)
+        return
+    while True:
+        chunk = raw.read1(chunk_size, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+def read_article_body(response):
+    """Read a streamed HTML response up to ARTICLE_MAX_BYTES (decompressed) and decode it"""
+    content_type = response.headers.get("Content-Type", "")
+    mime_type = content_type.split(";", 1)[0].strip().lower()
+    if mime_type and mime_type not in ARTICLE_CONTENT_TYPES:
+        raise ValueError(f"Unsupported content type for article extraction: {mime_type}")
+    # A compressed Content-Length only understates the decoded size, so it is safe to check too
+    declared_length = response.headers.get("Content-Length", "")
+    if declared_length.isdigit() and int(declared_length) > ARTICLE_MAX_BYTES:
+        raise ValueError(f"Page is too large ({int(declared_length)} bytes)")
+
+    body = bytearray()
+    for chunk in iter_response_chunks(response, ARTICLE_CHUNK_SIZE):
+        body += chunk
+        if len(body) >= ARTICLE_MAX_BYTES:
+            logging.warning(f"Article truncated at {ARTICLE_MAX_BYTES} bytes: {response.url}")
+            del body[ARTICLE_MAX_BYTES:]
+            break
+
+    # Charset from the header, else a <meta charset>, else UTF-8 (avoids chardet on the whole page)
+    encoding = None
+    if "charset=" in content_type.lower():
+        encoding = response.encoding
+    if not encoding:
+        match = META_CHARSET_RE.search(bytes(body[:4096]))
+        encoding = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        return body.decode(encoding, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+# Article extraction: trafilatura when installed, then a single-parse lxml text-density
+# extractor, then the original BeautifulSoup selector walk
+ARTICLE_MIN_CHARS = 200
+ARTICLE_MIN_PARAGRAPH_CHARS = 25
+ARTICLE_NOISE_TAGS = ("script", "style", "noscript", "template", "svg", "nav", "header", "footer",
+                      "aside", "form", "iframe", "button", "select")
+ARTICLE_PARAGRAPH_TAGS = ("p", "pre", "blockquote", "li", "td")
+ARTICLE_POSITIVE_RE = re.compile(r'article|body|content|entry|post|story|main|text', re.IGNORECASE)
+ARTICLE_NEGATIVE_RE = re.compile(r'comment|sidebar|footer|share|social|related|promo|advert|cookie|'
+                                 r'newsletter|subscribe|menu|breadcrumb|widget', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+TRAFILATURA_OPTIONS = {"include_comments": False, "include_tables": False}
+if trafilatura is not None:
+    # Skip trafilatura's slower readability/justext fallbacks (renamed from no_fallback to fast in 2.0)
+    fast_option = "fast" if "fast" in inspect.signature(trafilatura.extract).parameters else "no_fallback"
+    TRAFILATURA_OPTIONS[fast_option] = True
+
+def score_article_candidate(node, score):
+    """Adjust a container's paragraph score by its tag and class/id hints"""
+    hints = f"{node.get('class', '')} {node.get('id', '')} {node.get('itemprop', '')}"
+    if node.tag in ("article", "main") or node.get("itemprop") == "articleBody":
+        score *= 1.5
+    elif ARTICLE_POSITIVE_RE.search(hints):
+        score *= 1.25
+    if ARTICLE_NEGATIVE_RE.search(hints):
+        score *= 0.3
+    return score
+
+def extract_article_lxml(html):
+    """Parse once with lxml and return the text of the container with the densest prose"""
+    if not html or not html.strip():
+        return ""
+    doc = lxml_html.document_fromstring(html.encode("utf-8", "replace"),
+                                        parser=lxml_html.HTMLParser(encoding="utf-8", remove_comments=True))
+    for node in list(doc.iter(*ARTICLE_NOISE_TAGS)):
+        node.drop_tree()
+
+    # One pass over paragraph-like nodes; each credits its parent fully and grandparent by half
+    scores = {}
+    for node in doc.iter(*ARTICLE_PARAGRAPH_TAGS):
+        text = node.text_content()
+        text_length = len(WHITESPACE_RE.sub(" ", text).strip())
+        if text_length < ARTICLE_MIN_PARAGRAPH_CHARS:
+            continue
+        link_length = sum(len(link.text_content()) for link in node.iter("a"))
+        weight = (1 + text.count(",") + min(text_length / 100, 3)) * (1 - min(link_length / text_length, 1))
+        parent = node.getparent()
+        if parent is None:
+            continue
+        scores[parent] = scores.get(parent, 0) + weight
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0) + weight / 2
+
+    if scores:
+        best = max(scores, key=lambda node: score_article_candidate(node, scores[node]))
+        text = WHITESPACE_RE.sub(" ", best.text_content()).strip()
+        if len(text) >= ARTICLE_MIN_CHARS:
             return text
 
-        logging.info("Falling back to raw HTML body extraction if no specific content found.")
-        body = soup.find('body')
-        if body:
-            for elem in body(['script', 'style', 'nav', 'header', 'footer', 'aside', '.sidebar', '.comments', '#comments']):
-                elem.decompose()
-            raw_body_text = ' '.join(body.get_text(separator=' ', strip=True).split())
-            if len(raw_body_text) > 200:
-                return raw_body_text
-            elif len(raw_body_text) > 50:
-                return raw_body_text
-
-        logging.warning("BeautifulSoup extracted insufficient content from URL.")
-        return ""
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Network or HTTP error fetching URL {url}: {e}")
-        return ""
-    except Exception as e:
-        logging.error(f"General error extracting article from URL {url}: {e}")
+    body = doc.find("body")
+    text = WHITESPACE_RE.sub(" ", (body if body is not None else doc).text_content()).strip()
+    return text if len(text) > 50 else ""
+
+def parse_article_html(html):
+    """Extract the main article text from an HTML page with the fastest available extractor."""
+    if trafilatura is not None:
+        try:
+            text = trafilatura.extract(html, **TRAFILATURA_OPTIONS)
+            if text and len(text) >= ARTICLE_MIN_CHARS:
+                return text
+        except Exception as e:
+            logging.warning(f"trafilatura extraction failed, trying lxml: {e}")
+    if lxml_html is not None:
+        try:
+            text = extract_article_lxml(html)
+            if len(text) >= ARTICLE_MIN_CHARS:
+                return text
+        except Exception as e:
+            logging.warning(f"lxml extraction failed, falling back to BeautifulSoup: {e}")
+    return parse_article_html_bs4(html)
+
+def parse_article_html_bs4(html):
+    """Extract the main article text from an HTML page using BeautifulSoup."""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Prioritize common article content selectors
+    content_selectors = [
+        'article',
+        '.article-body-commercial-selector',
+        'main',
+        '.article-content',
+        '.post-content',
+        '.entry-content',
+        'div[itemprop="articleBody"]',
+        'div[id*="content"]',
+        'div[class*="text"]'
+    ]
+
+    text = ""
+    for selector in content_selectors:
+        elements = soup.select(selector)
+        if elements:
+            current_text = ' '.join(elem.get_text(separator=' ', strip=True) for elem in elements)
+            if len(current_text) > 200:
+                logging.info(f"BeautifulSoup extracted {len(current_text)} characters using selector: {selector}")
+                return current_text
+            elif len(current_text) > len(text):
+                text = current_text
+
+    # Fallback if specific selectors didn't yield much
+    if len(text) > 50:
+        return text
+
+    logging.info("Falling back to raw HTML body extraction if no specific content found.")
+    body = soup.find('body')
+    if body:
+        for elem in body(['script', 'style', 'nav', 'header', 'footer', 'aside', '.sidebar', '.comments', '#comments']):
+            elem.decompose()
+        raw_body_text = ' '.join(body.get_text(separator=' ', strip=True).split())
+        if len(raw_body_text) > 200:
+            return raw_body_text
+        elif len(raw_body_text) > 50:
+            return raw_body_text
+
+    logging.warning("BeautifulSoup extracted insufficient content from URL.")
+    return ""
+
+def extract_article_from_url(url):
+    """Fetch and extract article content from a URL, served from article_cache when possible."""
+    url_hash = sha256_str(url.strip())
+
+    def fresh_text(row):
+        if row and row["article_text"] and row["age"] < ARTICLE_CACHE_TTL:
+            return row["article_text"]
+        return None
+
+    cached = get_cached_article(url_hash)
+    if fresh_text(cached):
+        return cached["article_text"]
+
+    def lookup():
+        return fresh_text(get_cached_article(url_hash))
+
+    def compute():
+        try:
+            fetched = fetch_article_html(url, cached)
+            if fetched is None:
+                # 304 Not Modified: the stored copy is still current
+                logging.info(f"Article not modified, serving cached copy: {url}")
+                touch_article_cache(url_hash)
+                return cached["article_text"] or parse_article_html(cached["raw_html"] or "")
+            html, etag, last_modified = fetched
+            text = parse_article_html(html)
+            store_article_cache(url_hash, url, html, text, etag, last_modified)
+            return text
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Network or HTTP error fetching URL {url}: {e}")
+        except Exception as e:
+            logging.error(f"General error extracting article from URL {url}: {e}")
+        if cached and cached["article_text"]:
+            logging.info(f"Serving stale cached article after fetch failure: {url}")
+            return cached["article_text"]
         return ""
 
+    # Many users sharing the same popular article trigger one fetch
+    return single_flight(f"article:{url_hash}", lookup, compute)
+
 def generate_questions_for_claim(claim):
     """Generates up to 3 research questions for a claim."""
     prompt = f"For the following claim, propose up to 3 concise research questions. Only list the questions.\n\nClaim: {claim}"
@@ -455,8 +1258,92 @@ def generate_questions_for_claim(claim):
         logging.error(f"Failed to generate questions for claim '{claim}': {e}")
         return []
 
+def fallback_keywords(claim_text):
+    """Derive search keywords directly from the claim text"""
+    words = re.findall(r'\b[a-zA-Z]{4,}\b', claim_text.lower())
+    return list(set(words[:5])) or [claim_text.lower()[:50]]
+
+def format_model_verdict(parsed):
+    """Format a parsed verdict for display"""
+    content = f"Verdict: **{parsed['verdict']}**\n\nJustification: {parsed['justification']}"
+    if parsed["sources"]:
+        content += f"\n\nSources:\n" + "\n".join(f"- {src}" for src in parsed["sources"])
+    return content
+
+def parse_verdict_json(raw_response):
+    """Parse the combined JSON verdict response. Returns None if it is not a usable JSON object."""
+    start, end = raw_response.find("{"), raw_response.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    data = json_loads(raw_response[start:end + 1], None)
+    if not isinstance(data, dict):
+        return None
+    return parse_verdict_fields(data)
+
+def parse_verdict_fields(data):
+    """Validate and clean one decoded verdict object. Returns None without a valid verdict."""
+    verdict = str(data.get("verdict") or "").strip().upper()
+    if verdict not in VERDICT_LABELS:
+        return None
+
+    def as_list(value):
+        if isinstance(value, list):
+            return [str(v) for v in value if v]
+        if isinstance(value, str):
+            return [v for v in re.split(r'[,;\n]+', value) if v.strip()]
+        return []
+
+    justification = normalize_text_for_display(str(data.get("justification") or "")).strip()[:1000]
+    sources = re.findall(r'(https?://[^\s,)]+)', " ".join(as_list(data.get("sources"))))[:2]
+    keywords = [kw.strip().lower() for kw in as_list(data.get("keywords")) if len(kw.strip()) > 3][:5]
+    questions = [normalize_text_for_display(q).strip("-•* ").strip() for q in as_list(data.get("questions"))]
+
+    return {
+        "verdict": verdict,
+        "justification": justification or 'Justification could not be parsed from response.',
+        "sources": sources,
+        "keywords": keywords,
+        "questions": [q for q in questions if len(q) > 5][:3],
+    }
+
+def parse_verdict_text(raw_response):
+    """Regex fallback for labelled 'Verdict: / Justification: / ...' responses. Returns None without a verdict."""
+    verdict_match = re.search(r'Verdict:\s*(VERIFIED|PARTIALLY_SUPPORTED|INCONCLUSIVE|CONTRADICTED|SUPPORTED|NOT_SUPPORTED|FEASIBLE|POSSIBLE_BUT_UNPROVEN|UNLIKELY|NONSENSE)', raw_response, re.IGNORECASE)
+    if not verdict_match:
+        return None
+
+    verdict = verdict_match.group(1).upper()
+    justification_match = re.search(r'Justification:\s*([\s\S]{20,1000}?(?=\n\s*(?:Sources|Keywords|Questions|$)))', raw_response, re.IGNORECASE | re.DOTALL)
+    justification = justification_match.group(1).strip()[:1000] if justification_match else 'Justification could not be parsed from response.'
+
+    sources_match = re.search(r'Sources:\s*([\s\S]*?)(?=\n\s*(?:Keywords|Questions|$))', raw_response, re.IGNORECASE | re.DOTALL)
+    sources = []
+    if sources_match:
+        source_text = sources_match.group(1).strip()
+        sources = re.findall(r'(https?://[^\s,)]+)', source_text)[:2]
+
+    keywords = []
+    keywords_match = re.search(r'Keywords:[ \t]*([\w \t,-]{10,})', raw_response, re.IGNORECASE)
+    if keywords_match:
+        kw_text = keywords_match.group(1).strip()
+        keywords = [kw.strip().lower() for kw in re.split(r'[,;\s]+', kw_text) if len(kw.strip()) > 3][:5]
+
+    questions = []
+    questions_match = re.search(r'Questions:\s*([\s\S]*)$', raw_response, re.IGNORECASE)
+    if questions_match:
+        questions = [re.sub(r'^\s*(?:[-•*]|\d+[.)])\s*', '', q).strip() for q in questions_match.group(1).splitlines()]
+        questions = [q for q in questions if len(q) > 5][:3]
+
+    return {
+        "verdict": verdict,
+        "justification": justification,
+        "sources": sources,
+        "keywords": keywords,
+        "questions": questions,
+    }
+
 def generate_model_verdict_and_questions(prompt, claim_text):
-    """Generate model verdict, questions and keywords from claim text"""
+    """Generate model verdict, questions and keywords from claim text in a single completion"""
     model_verdict_content = "Could not generate model verdict."
     questions = []
     search_keywords = []
@@ -466,49 +1353,33 @@ def generate_model_verdict_and_questions(prompt, claim_text):
 
     while retry_count < max_retries:
         try:
-            res = call_openrouter(prompt, json_mode=False, temperature=0.0)
-            raw_llm_response = res.json().get("choices", [{}])[0].get("message", {}).get("content", "")
-            raw_llm_response = normalize_text_for_display(raw_llm_response)
+            res = call_openrouter(prompt, json_mode=True, temperature=0.0)
+            raw_llm_response = res.json().get("choices", [{}])[0].get("message", {}).get("content", "") or ""
 
             if not raw_llm_response.strip():
                 raise ValueError("Empty response from OpenRouter")
 
-            # Parse text response with regex
-            verdict_match = re.search(r'Verdict:\s*(VERIFIED|PARTIALLY_SUPPORTED|INCONCLUSIVE|CONTRADICTED|SUPPORTED|NOT_SUPPORTED|FEASIBLE|POSSIBLE_BUT_UNPROVEN|UNLIKELY|NONSENSE)', raw_llm_response, re.IGNORECASE)
-            if not verdict_match:
+            # Structured JSON first, regex parsing of labelled text as a fallback
+            parsed = parse_verdict_json(raw_llm_response)
+            if parsed is None:
+                parsed = parse_verdict_text(normalize_text_for_display(raw_llm_response))
+            if parsed is None:
                 logging.warning(f"Invalid verdict format in attempt {retry_count + 1}, retrying...")
                 retry_count += 1
                 continue
 
-            verdict = verdict_match.group(1).upper()
-            justification_match = re.search(r'Justification:\s*([\s\S]{20,1000}?(?=\n\s*(?:Sources|Keywords|$)))', raw_llm_response, re.IGNORECASE | re.DOTALL)
-            justification = justification_match.group(1).strip()[:1000] if justification_match else 'Justification could not be parsed from response.'
-
-            sources_match = re.search(r'Sources:\s*([\s\S]*?)(?=\n\s*(?:Keywords|$))', raw_llm_response, re.IGNORECASE | re.DOTALL)
-            sources = []
-            if sources_match:
-                source_text = sources_match.group(1).strip()
-                sources = re.findall(r'(https?://[^\s,)]+)', source_text)[:2] or ['None']
-
-            keywords_match = re.search(r'Keywords:\s*([\w\s,-]{10,})', raw_llm_response, re.IGNORECASE | re.DOTALL)
-            if keywords_match:
-                kw_text = keywords_match.group(1).strip()
-                search_keywords = [kw.strip().lower() for kw in re.split(r'[,;\s]+', kw_text) if len(kw.strip()) > 3][:5]
-            else:
-                words = re.findall(r'\b[a-zA-Z]{4,}\b', claim_text.lower())
-                search_keywords = list(set(words[:5])) or [claim_text.lower()[:50]]
+            search_keywords = parsed["keywords"] or fallback_keywords(claim_text)
 
-            # Format for display
-            model_verdict_content = f"Verdict: **{verdict}**\n\nJustification: {justification}"
-            if sources and sources != ['None']:
-                model_verdict_content += f"\n\nSources:\n" + "\n".join(f"- {src}" for src in sources)
+            model_verdict_content = format_model_verdict(parsed)
 
-            # Generate questions
-            try:
-                questions = generate_questions_for_claim(claim_text)
-            except Exception as e:
-                logging.error(f"Failed to generate questions: {e}")
-                questions = ["Could not generate research questions"]
+            # Only fall back to a second completion when the combined response had no questions
+            questions = parsed["questions"]
+            if not questions:
+                try:
+                    questions = generate_questions_for_claim(claim_text)
+                except Exception as e:
+                    logging.error(f"Failed to generate questions: {e}")
+                    questions = ["Could not generate research questions"]
 
             break  # Successful parse, exit retry loop
 
@@ -517,12 +1388,338 @@ def generate_model_verdict_and_questions(prompt, claim_text):
             retry_count += 1
             if retry_count == max_retries:
                 model_verdict_content = f"Error generating verdict after {max_retries} attempts: {str(e)}"
-                words = re.findall(r'\b[a-zA-Z]{4,}\b', claim_text.lower())
-                search_keywords = list(set(words[:5])) or [claim_text.lower()[:50]]
+                search_keywords = fallback_keywords(claim_text)
                 questions = ["Could not generate research questions"]
 
     return model_verdict_content, questions, search_keywords
 
+LLM_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_CONCURRENCY", "4")), thread_name_prefix="llm")
+
+# Claim extraction: long texts are split into overlapping chunks extracted concurrently
+EXTRACTION_CHUNK_CHARS = 6000
+EXTRACTION_CHUNK_OVERLAP = 400
+EXTRACTION_MAX_CHUNKS = 24
+# Own pool, so extraction never queues claim-detail batches behind it; each request keeps at
+# most EXTRACTION_REQUEST_CONCURRENCY chunks in flight so one long text cannot fill the pool
+EXTRACTION_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("EXTRACTION_CONCURRENCY", "8")), thread_name_prefix="extract")
+EXTRACTION_REQUEST_CONCURRENCY = max(1, int(os.getenv("EXTRACTION_REQUEST_CONCURRENCY", "4")))
+CLAIM_FILLER_WORDS = frozenset(("a", "an", "the", "that"))
+CLAIM_OVERLAP_MIN_COVERAGE = 0.8  # share of a claim's words that must occur in the overlap window
+PARAGRAPH_SPLIT_RE = re.compile(r'\n\s*\n')
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+def split_text_units(text, max_chars):
+    """Paragraphs, or sentences of over-long paragraphs, or word-wrapped pieces of over-long sentences"""
+    for paragraph in PARAGRAPH_SPLIT_RE.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            yield paragraph
+            continue
+        for sentence in SENTENCE_SPLIT_RE.split(paragraph):
+            while len(sentence) > max_chars:
+                # Unpunctuated transcripts: cut at the last space before the limit
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                yield sentence[:cut]
+                sentence = sentence[cut:].lstrip()
+            if sentence:
+                yield sentence
+
+def overlap_tail(text, overlap):
+    """The last ~overlap characters of text, starting at a sentence (or at least word) boundary"""
+    if len(text) <= overlap:
+        return text
+    tail = text[-overlap:]
+    sentence = SENTENCE_SPLIT_RE.search(tail)
+    if sentence:
+        return tail[sentence.end():]
+    space = tail.find(" ")
+    return tail[space + 1:] if space != -1 else tail
+
+def split_text_for_extraction(text, max_chars=EXTRACTION_CHUNK_CHARS, overlap=EXTRACTION_CHUNK_OVERLAP):
+    """Pack paragraph/sentence units into (chunk_text, overlap_text) pairs of at most max_chars.
+
+    Each chunk after the first starts with overlap_text, the last ~overlap characters of its
+    predecessor, so no claim is cut in half; the first chunk's overlap_text is empty.
+    """
+    chunks, current, current_len, carried = [], [], 0, ""
+    for unit in split_text_units(text, max_chars - overlap):
+        if current and current_len + len(unit) + 2 > max_chars:
+            chunks.append(("\n\n".join(current), carried))
+            carried = overlap_tail(chunks[-1][0], overlap)
+            current, current_len = ([carried], len(carried)) if carried else ([], 0)
+        current.append(unit)
+        current_len += len(unit) + 2
+    if current:
+        chunks.append(("\n\n".join(current), carried))
+    return chunks
+
+def parse_claim_line(line):
+    """Claim text of one line of the extraction model's numbered list, or None"""
+    stripped_line = line.strip()
+    if not stripped_line:
+        return None
+    claim = stripped_line
+    if stripped_line[0].isdigit():
+        content_start = 0
+        while content_start < len(stripped_line) and (stripped_line[content_start].isdigit() or stripped_line[content_start] in ['.', ' ']):
+            content_start += 1
+        if content_start >= len(stripped_line):
+            return None
+        claim = stripped_line[content_start:].strip()
+    if len(claim) <= 10 or claim.lower().startswith(("output:", "text:", "no explicit claims found")):
+        return None
+    return claim
+
+def parse_claims_list(raw_claims):
+    """Parse the extraction model's numbered list into claim strings"""
+    if "No explicit claims found" in raw_claims or not raw_claims.strip():
+        return []
+    return [claim for claim in map(parse_claim_line, raw_claims.splitlines()) if claim]
+
+def claim_tokens(text):
+    """Lowercased words and numbers of a claim, without punctuation or articles"""
+    return tuple(word for word in re.findall(r'\w+', text.lower()) if word not in CLAIM_FILLER_WORDS)
+
+def claim_from_window(tokens, window_tokens):
+    """Whether a claim's words (nearly) all occur in an overlap window, i.e. it came from that text"""
+    return bool(tokens) and sum(token in window_tokens for token in tokens) >= CLAIM_OVERLAP_MIN_COVERAGE * len(tokens)
+
+def merge_chunk_claims(chunk_claims, chunks):
+    """Yield per-chunk claims in document order, dropping a claim only when the previous chunk
+    extracted the same claim (same normalized words) from the overlap the two chunks share.
+
+    chunk_claims yields (chunk_index, claims); chunks are split_text_for_extraction() pairs.
+    """
+    previous_index, previous_tokens = None, []
+    for index, claims in chunk_claims:
+        overlap_keys, window_tokens = set(), set()
+        if index > 0 and previous_index == index - 1:
+            window_tokens = set(claim_tokens(chunks[index][1]))
+            overlap_keys = {tokens for tokens in previous_tokens if claim_from_window(tokens, window_tokens)}
+        current_tokens = []
+        for claim in claims:
+            tokens = claim_tokens(claim)
+            current_tokens.append(tokens)
+            if tokens in overlap_keys and claim_from_window(tokens, window_tokens):
+                continue
+            yield claim
+        previous_index, previous_tokens = index, current_tokens
+
+def extract_claims_from_text(text, mode):
+    """Run the extraction prompt for one piece of text and parse the numbered list"""
+    res = call_openrouter(extraction_templates[mode].format(text=text))
+    raw_claims = res.json()["choices"][0]["message"]["content"]
+    if not (raw_claims or "").strip():
+        # A blank completion is a failed call, not a text without claims
+        raise ValueError("Empty response from the extraction model")
+    return parse_claims_list(raw_claims)
+
+def stream_claims_from_text(text, mode):
+    """Run the extraction prompt with a streamed completion, yielding each claim as its line completes"""
+    response = call_openrouter(extraction_templates[mode].format(text=text), stream=True)
+    try:
+        pending, received = "", False
+        for content in iter_completion_deltas(response):
+            pending += content
+            received = received or bool(content.strip())
+            if "\n" not in content:
+                continue
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                claim = parse_claim_line(line)
+                if claim and "No explicit claims found" not in line:
+                    yield claim
+        claim = parse_claim_line(pending)
+        if claim and "No explicit claims found" not in pending:
+            yield claim
+        if not received:
+            raise ValueError("Empty response from the extraction model")
+    finally:
+        response.close()
+
+def plan_extraction_chunks(text):
+    chunks = split_text_for_extraction(text)
+    if len(chunks) > EXTRACTION_MAX_CHUNKS:
+        # Very long inputs: fewer, larger chunks rather than an unbounded number of calls
+        chunks = split_text_for_extraction(text, max_chars=-(-len(text) // EXTRACTION_MAX_CHUNKS) + EXTRACTION_CHUNK_OVERLAP)
+    return chunks
+
+def iter_chunk_claims(text, chunks, mode, failed_chunks=None):
+    """Extract chunks concurrently, yielding (chunk_index, claims) in document order.
+
+    Up to EXTRACTION_REQUEST_CONCURRENCY chunks run at once; the next one is submitted as each
+    is consumed. A failed chunk is logged, appended to failed_chunks and skipped; the first
+    error is raised only if every chunk failed.
+    """
+    logging.info(f"Extracting claims from {len(text)} characters in {len(chunks)} chunks")
+    futures = {}
+
+    def submit(index):
+        if index < len(chunks):
+            futures[index] = EXTRACTION_EXECUTOR.submit(extract_claims_from_text, chunks[index][0], mode)
+
+    for index in range(EXTRACTION_REQUEST_CONCURRENCY):
+        submit(index)
+    errors = []
+    for index in range(len(chunks)):
+        try:
+            claims = futures.pop(index).result()
+        except Exception as e:
+            logging.error(f"Claim extraction failed for chunk {index + 1}/{len(chunks)}: {e}")
+            errors.append(e)
+            if failed_chunks is not None:
+                failed_chunks.append(index)
+            claims = None
+        submit(index + EXTRACTION_REQUEST_CONCURRENCY)
+        if claims is not None:
+            yield index, claims
+    if len(errors) == len(chunks):
+        raise errors[0]
+
+def extract_claims(text, mode):
+    """Extract claims from text of any length; chunks are extracted concurrently and merged.
+
+    Returns (claims_list, complete); complete is False when some chunks failed.
+    """
+    chunks = plan_extraction_chunks(text)
+    if len(chunks) <= 1:
+        return extract_claims_from_text(text, mode), True
+    failed_chunks = []
+    claims_list = list(merge_chunk_claims(iter_chunk_claims(text, chunks, mode, failed_chunks), chunks))
+    return claims_list, not failed_chunks
+
+def iter_extracted_claims(text, mode, failed_chunks=None):
+    """Like extract_claims(), but yields each distinct claim as soon as it is available.
+
+    Single-chunk texts are streamed token by token; long texts yield chunk by chunk in order.
+    Indexes of chunks that failed are appended to failed_chunks.
+    """
+    chunks = plan_extraction_chunks(text)
+    if len(chunks) <= 1:
+        # Nothing to merge, same as extract_claims()
+        yield from stream_claims_from_text(text, mode)
+        return
+    yield from merge_chunk_claims(iter_chunk_claims(text, chunks, mode, failed_chunks), chunks)
+
+def normalize_text_for_extraction_key(text):
+    """Canonical form of an input text for cache keys: NFKC with whitespace runs collapsed"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+def extraction_cache_key(text, mode):
+    """(text_hash, cache_key); the key includes the prompt so template edits invalidate it"""
+    text_hash = sha256_str(normalize_text_for_extraction_key(text))
+    prompt_hash = sha256_str(extraction_templates[mode])
+    return text_hash, sha256_str(f"{text_hash}|{mode}|{prompt_hash}")
+
+def extract_claims_cached(text, mode):
+    """extract_claims() through the extraction cache; returns (claims_list, cached)"""
+    text_hash, cache_key = extraction_cache_key(text, mode)
+    cached_claims = get_extraction_cache(cache_key)
+    if cached_claims is not None:
+        return cached_claims, True
+
+    def compute():
+        claims_list, complete = extract_claims(text, mode)
+        # Never cache a list truncated by failed chunks (e.g. rate-limited calls)
+        if complete:
+            store_extraction_cache(cache_key, text_hash, text, mode, claims_list)
+        return claims_list
+
+    return single_flight(extraction_lease_key(cache_key), lambda: get_extraction_cache(cache_key), compute), False
+
+def extraction_lease_key(cache_key):
+    return f"extract:{cache_key}"
+
+def pack_claim_batches(claims, max_claims=BATCH_MAX_CLAIMS, max_chars=BATCH_MAX_PROMPT_CHARS):
+    """Group (claim_hash, claim_text) pairs into as few prompts as the size limits allow"""
+    batches, current, current_chars = [], [], 0
+    for claim in claims:
+        claim_chars = len(claim[1]) + 16
+        if current and (len(current) >= max_claims or current_chars + claim_chars > max_chars):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(claim)
+        current_chars += claim_chars
+    if current:
+        batches.append(current)
+    return batches
+
+def generate_batch_verdicts(batch, mode):
+    """Generate verdicts for a batch of (claim_hash, claim_text) pairs in one completion.
+
+    Returns {claim_hash: (model_verdict_content, questions, search_keywords)} for the claims
+    the batched response covered; the caller falls back to generate_claim_verdict() for the rest.
+    """
+    claim_kind = batch_claim_kinds.get(mode, "claim")
+    numbered_claims = "\n".join(f'{i}. "{claim_text}"' for i, (_, claim_text) in enumerate(batch, start=1))
+    prompt = BATCH_VERIFICATION_PROMPT.format(claim_kind=claim_kind, entry_example=BATCH_ENTRY_EXAMPLE,
+                                              field_rules=VERDICT_FIELD_RULES, claims=numbered_claims)
+
+    results = {}
+    try:
+        res = call_openrouter(prompt, json_mode=True, temperature=0.0)
+        raw_llm_response = res.json().get("choices", [{}])[0].get("message", {}).get("content", "") or ""
+        start, end = raw_llm_response.find("{"), raw_llm_response.rfind("}")
+        data = json_loads(raw_llm_response[start:end + 1], {}) if start != -1 and end > start else {}
+        entries = data.get("results", []) if isinstance(data, dict) else []
+
+        for position, entry in enumerate(entries if isinstance(entries, list) else [], start=1):
+            if not isinstance(entry, dict):
+                continue
+            try:
+                number = int(entry.get("claim", position))
+            except (TypeError, ValueError):
+                number = position
+            if not 1 <= number <= len(batch):
+                continue
+            parsed = parse_verdict_fields(entry)
+            if parsed is None or not parsed["questions"]:
+                continue
+            claim_hash, claim_text = batch[number - 1]
+            results[claim_hash] = (
+                format_model_verdict(parsed),
+                parsed["questions"],
+                parsed["keywords"] or fallback_keywords(claim_text),
+            )
+    except Exception as e:
+        logging.error(f"Batched verdict generation failed for {len(batch)} claims: {e}")
+    return results
+
+def generate_claim_verdict(claim_text, mode):
+    """Model verdict, questions and keywords for one claim from its own completion"""
+    verdict_prompt = verification_prompts[(mode if mode in verification_prompts else 'General Analysis of Testable Claims')].format(claim=claim_text)
+    return generate_model_verdict_and_questions(verdict_prompt, claim_text)
+
+def generate_single_verdicts(claims, mode):
+    """Like generate_batch_verdicts(), but with one completion per (claim_hash, claim_text) pair"""
+    return {claim_hash: generate_claim_verdict(claim_text, mode) for claim_hash, claim_text in claims}
+
+def compute_model_details(claim_hash, claim_text, mode):
+    """Generate and store the model verdict, questions and keywords for one claim"""
+    model_verdict_content, questions, search_keywords = generate_claim_verdict(claim_text, mode)
+    store_model_cache(claim_hash, model_verdict_content, questions, search_keywords)
+    return {
+        "model_verdict": model_verdict_content,
+        "questions": questions or [],
+        "search_keywords": search_keywords or [],
+        "cached": False
+    }
+
+def model_details_single_flight(claim_hash, claim_text, mode):
+    """Cached model details for a claim, waiting on (or else doing) the one in-flight computation"""
+    def lookup():
+        hit = get_model_cache(claim_hash)
+        return {**hit, "cached": True} if hit else None
+
+    return single_flight(model_lease_key(claim_hash), lookup,
+                         lambda: compute_model_details(claim_hash, claim_text, mode))
+
+def model_lease_key(claim_hash):
+    return f"model:{claim_hash}"
+
 def fetch_crossref(keywords):
     if not keywords:
         return []
@@ -532,7 +1729,7 @@ def fetch_crossref(keywords):
     headers = {"User-Agent": "SciCheckAgent/1.0 (mailto:alizgravenil@gmail.com)"}
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = HTTP_SESSION.get(url, headers=headers, timeout=10)
         response.raise_for_status()
         items = response.json().get("message", {}).get("items", [])
         results = []
@@ -556,7 +1753,7 @@ def fetch_core(keywords):
     headers = {"User-Agent": "SciCheckFallback/1.0"}
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = HTTP_SESSION.get(url, headers=headers, timeout=10)
         response.raise_for_status()
         results = []
         if "data" in response.json():
@@ -590,7 +1787,7 @@ def fetch_semantic_scholar(keywords, max_results=3):
     }
 
     try:
-        response = requests.get(
+        response = HTTP_SESSION.get(
             "https://api.semanticscholar.org/graph/v1/paper/search",
             headers=headers,
             params=params,
@@ -646,15 +1843,20 @@ def fetch_pubmed(keywords):
     url = f"https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi?db=pubmed&term={search_query}&retmode=json&retmax=3"
 
     try:
-        response = requests.get(url, timeout=10)
+        # Both requests run inside the two slots fetch_all_sources reserved for PubMed
+        search_started = time.monotonic()
+        response = HTTP_SESSION.get(url, timeout=10)
         response.raise_for_status()
         data = response.json()
         id_list = data.get('esearchresult', {}).get('idlist', [])
         if not id_list:
             return []
 
+        delay = search_started + PROVIDER_MIN_INTERVALS["pubmed"] - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
         details_url = f"https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi?db=pubmed&id={','.join(id_list)}&retmode=json"
-        details_response = requests.get(details_url, timeout=10)
+        details_response = HTTP_SESSION.get(details_url, timeout=10)
         details_data = details_response.json()
         results = []
         for pubmed_id in id_list:
@@ -669,137 +1871,395 @@ def fetch_pubmed(keywords):
         logging.warning(f"PubMed API call failed: {e}")
         return []
 
-def analyze_image_with_ocr(image_path):
+def fetch_all_sources(keywords, deadline=EXTERNAL_FETCH_DEADLINE, missed_providers=None):
+    """Query all literature providers concurrently, returning whatever arrives before the deadline.
+
+    Providers that were skipped, missed the deadline or failed are appended to missed_providers.
+    """
+    missed = missed_providers if missed_providers is not None else []
+    providers = [
+        # (display name, rate-limit key, fetch function, requests per lookup)
+        ("Semantic Scholar", "semantic_scholar", fetch_semantic_scholar, 1),
+        ("CrossRef", "crossref", fetch_crossref, 1),
+        ("CORE", "core", fetch_core, 1),
+        ("PubMed", "pubmed", fetch_pubmed, 2),
+    ]
+    cutoff = time.monotonic() + deadline
+    scheduled = []
+    for name, provider, fetch, request_count in providers:
+        slot = reserve_rate_limit_slot(provider, cutoff - EXTERNAL_FETCH_MIN_BUDGET, request_count)
+        if slot is None:
+            logging.warning(f"{name} is rate limited past the {deadline}s deadline, skipping")
+            missed.append(name)
+            continue
+        scheduled.append((slot, name, fetch))
+
+    # Rate-limit waits happen here, in the request thread, so pool workers never sleep on them
+    futures = []
+    for slot, name, fetch in sorted(scheduled, key=lambda item: item[0]):
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        futures.append((name, SOURCE_FETCH_EXECUTOR.submit(fetch, keywords)))
+    wait([future for _, future in futures], timeout=max(0, cutoff - time.monotonic()))
+
+    all_sources = []
+    for name, future in futures:
+        if not future.done():
+            future.cancel()
+            logging.warning(f"{name} lookup missed the {deadline}s deadline, skipping")
+            missed.append(name)
+            continue
+        try:
+            all_sources.extend(future.result())
+        except Exception as e:
+            logging.warning(f"{name} lookup failed: {e}")
+            missed.append(name)
+    return all_sources
+
+# OCR: images are preprocessed and recognized in a process pool so CPU work stays off web workers
+# Per web worker process, so keep it small when the app runs several workers
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_TIMEOUT = 120
+# forkserver/spawn workers start from a clean interpreter instead of forking a threaded web worker
+OCR_START_METHOD = os.getenv("OCR_START_METHOD") or (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+OCR_PSM_VALUES = range(0, 14)
+OCR_OEM_VALUES = range(0, 4)
+
+_ocr_pool = None
+_ocr_pool_pid = None
+_ocr_pool_lock = threading.Lock()
+
+def get_ocr_pool():
+    """Process pool for OCR, created on first use (and again after a fork or a crashed worker)"""
+    global _ocr_pool, _ocr_pool_pid
+    with _ocr_pool_lock:
+        if _ocr_pool is None or _ocr_pool_pid != os.getpid():
+            context = multiprocessing.get_context(OCR_START_METHOD)
+            if OCR_START_METHOD == "forkserver":
+                context.set_forkserver_preload(["ocr_worker"])
+            _ocr_pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=context)
+            _ocr_pool_pid = os.getpid()
+        return _ocr_pool
+
+def reset_ocr_pool():
+    global _ocr_pool
+    with _ocr_pool_lock:
+        _ocr_pool = None
+
+def parse_ocr_options(form):
+    """Read optional psm/oem form fields; raises ValueError on invalid values"""
+    options = {}
+    for name, allowed, default in (("psm", OCR_PSM_VALUES, OCR_DEFAULT_PSM),
+                                   ("oem", OCR_OEM_VALUES, OCR_DEFAULT_OEM)):
+        raw = (form.get(name) or "").strip()
+        try:
+            value = int(raw) if raw else default
+        except ValueError:
+            value = None
+        if value not in allowed:
+            raise ValueError(f"Invalid {name}: must be an integer from {allowed.start} to {allowed.stop - 1}.")
+        options[name] = value
+    return options
+
+def analyze_image_with_ocr(image_path, psm=OCR_DEFAULT_PSM, oem=OCR_DEFAULT_OEM):
     """Extract text from image using OCR"""
     try:
-        extracted_text = pytesseract.image_to_string(Image.open(image_path))
-        return extracted_text.strip()
+        future = get_ocr_pool().submit(ocr_image_file, image_path, psm, oem)
+        return future.result(timeout=OCR_TIMEOUT)
+    except BrokenProcessPool as e:
+        logging.error(f"OCR worker crashed: {e}")
+        reset_ocr_pool()
+        return ""
     except Exception as e:
         logging.error(f"OCR processing failed: {e}")
         return ""
 
-def transcribe_video(video_path, max_retries=5, retry_delay=5):
+# Audio extraction: ffmpeg pulls only the audio stream and encodes speech-sized MP3
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+FFPROBE_BIN = os.getenv("FFPROBE_BIN", "ffprobe")
+AUDIO_SAMPLE_RATE = 16000  # Whisper resamples to 16 kHz mono anyway
+AUDIO_BITRATE = "32k"
+FFMPEG_TIMEOUT = 600
+
+FFMPEG_DURATION_RE = re.compile(r'Duration: (\d+):(\d\d):(\d\d(?:\.\d+)?)')
+
+def probe_duration(media_path):
+    """Return a media file's duration in seconds (ffprobe, else ffmpeg's banner), or None"""
+    try:
+        result = subprocess.run(
+            [FFPROBE_BIN, "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", media_path],
+            capture_output=True, text=True, timeout=30
+        )
+        return float(result.stdout.strip())
+    except (OSError, subprocess.SubprocessError, ValueError):
+        pass
+    try:
+        # "ffmpeg -i" without an output exits non-zero but still prints the input's duration
+        result = subprocess.run([FFMPEG_BIN, "-hide_banner", "-nostdin", "-i", media_path],
+                                capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = FFMPEG_DURATION_RE.search(result.stderr)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+def extract_audio(video_path, audio_path):
+    """Extract the audio track of a video to mono 16 kHz low-bitrate MP3 with ffmpeg"""
+    command = [
+        FFMPEG_BIN, "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", video_path,
+        "-vn", "-sn", "-dn",                                   # skip video/subtitle/data streams
+        "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE),
+        "-c:a", "libmp3lame", "-b:a", AUDIO_BITRATE,
+        audio_path,
+    ]
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=FFMPEG_TIMEOUT)
+    except FileNotFoundError:
+        raise ValueError("ffmpeg is not installed on the server.")
+    except subprocess.TimeoutExpired:
+        raise ValueError("Audio extraction timed out.")
+    if result.returncode != 0 or not os.path.exists(audio_path):
+        error = result.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise ValueError(f"Could not extract audio from video: {error[0]}")
+
+    elapsed = time.perf_counter() - start
+    duration = probe_duration(audio_path)
+    size_kb = os.path.getsize(audio_path) / 1024
+    if duration:
+        logging.info(f"Extracted {duration / 60:.1f} min of audio in {elapsed:.2f}s "
+                     f"({elapsed / (duration / 60):.2f}s per minute of video, {size_kb:.0f} KB)")
+    else:
+        logging.info(f"Extracted audio in {elapsed:.2f}s ({size_kb:.0f} KB)")
+    return audio_path
+
+def whisper_transcribe_file(audio_path, max_retries=5, retry_delay=5, progress=None, allow_empty=False):
+    """Upload one audio file to the Whisper API and return its transcription"""
+    WHISPER_API_KEY = os.getenv("WHISPER_API_KEY")
+    if not WHISPER_API_KEY:
+        raise ValueError("WHISPER_API_KEY is not set in environment variables.")
+
+    with open(audio_path, "rb") as audio_file:
+        files = {"file": audio_file}
+        headers = {"X-API-Key": WHISPER_API_KEY}
+        data = {
+            "format": "text",
+            "language": "en",
+            "model_size": "base"
+        }
+
+        response = HTTP_SESSION.post(
+            "https://api.whisper-api.com/transcribe",
+            files=files,
+            headers=headers,
+            data=data,
+            timeout=120
+        )
+
+    if response.status_code != 200:
+        raise ValueError(f"Whisper API error: {response.status_code} - {response.text}")
+    result = response.json()
+    if result.get("status") == "pending":
+        task_id = result.get("task_id")
+        if not task_id:
+            raise ValueError("No task_id returned for pending transcription")
+        return poll_transcription_status(task_id, WHISPER_API_KEY, max_retries, retry_delay, progress)
+    transcription = result.get("result", "")
+    if not transcription and not allow_empty:
+        raise ValueError("No transcription returned from Whisper API")
+    return transcription
+
+# Long audio is cut at silences into overlapping chunks that are transcribed in parallel
+TRANSCRIBE_CHUNK_SECONDS = 300      # target chunk length
+TRANSCRIBE_CHUNK_SLACK = 60         # audio up to CHUNK + SLACK seconds is sent whole
+TRANSCRIBE_CHUNK_OVERLAP = 2.0      # seconds shared by neighbouring chunks
+TRANSCRIBE_SILENCE_WINDOW = 30      # how far from the target a silence may move a cut
+SILENCE_NOISE_DB = -35
+SILENCE_MIN_SECONDS = 0.4
+TRANSCRIBE_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("TRANSCRIBE_PARALLELISM", "3")),
+                                         thread_name_prefix="transcribe")
+SILENCE_START_RE = re.compile(r'silence_start: (-?\d+(?:\.\d+)?)')
+SILENCE_END_RE = re.compile(r'silence_end: (\d+(?:\.\d+)?)')
+
+def detect_silences(audio_path):
+    """Return the midpoints (seconds) of silent stretches found by ffmpeg silencedetect"""
+    try:
+        result = subprocess.run(
+            [FFMPEG_BIN, "-nostdin", "-hide_banner", "-i", audio_path,
+             "-af", f"silencedetect=noise={SILENCE_NOISE_DB}dB:d={SILENCE_MIN_SECONDS}",
+             "-f", "null", "-"],
+            capture_output=True, text=True, timeout=FFMPEG_TIMEOUT
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logging.warning(f"Silence detection failed, cutting at fixed offsets: {e}")
+        return []
+    starts = [max(0.0, float(value)) for value in SILENCE_START_RE.findall(result.stderr)]
+    ends = [float(value) for value in SILENCE_END_RE.findall(result.stderr)]
+    return [(start + end) / 2 for start, end in zip(starts, ends)]
+
+def plan_audio_segments(duration, silences):
+    """Split [0, duration] into overlapping (start, end) chunks, cutting at silences when possible"""
+    segments = []
+    start = 0.0
+    while duration - start > TRANSCRIBE_CHUNK_SECONDS + TRANSCRIBE_CHUNK_SLACK:
+        target = start + TRANSCRIBE_CHUNK_SECONDS
+        nearby = [point for point in silences if abs(point - target) <= TRANSCRIBE_SILENCE_WINDOW]
+        cut = min(nearby, key=lambda point: abs(point - target)) if nearby else target
+        segments.append((start, cut + TRANSCRIBE_CHUNK_OVERLAP))
+        start = cut
+    segments.append((start, duration))
+    return segments
+
+def cut_audio_segment(audio_path, start, end, segment_path):
+    """Copy [start, end) of an audio file into its own file without re-encoding"""
+    result = subprocess.run(
+        [FFMPEG_BIN, "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+         "-ss", f"{start:.3f}", "-i", audio_path, "-t", f"{end - start:.3f}",
+         "-c", "copy", segment_path],
+        capture_output=True, text=True, timeout=FFMPEG_TIMEOUT
+    )
+    if result.returncode != 0:
+        raise ValueError(f"Could not split audio: {result.stderr.strip()}")
+    return segment_path
+
+def transcribe_audio_chunk(chunk_path, max_retries, retry_delay):
+    """Transcribe one chunk, cached in media_cache by content hash so retries skip finished chunks"""
+    chunk_hash = compute_file_hash(chunk_path)
+    cached = get_cached_media(chunk_hash)
+    if cached is not None:
+        return cached
+    transcription = whisper_transcribe_file(chunk_path, max_retries, retry_delay, allow_empty=True)
+    store_media_cache(chunk_hash, 'audio_chunk', transcription)
+    return transcription
+
+def stitch_transcripts(parts, max_overlap_words=30):
+    """Join chunk transcripts in order, dropping words repeated across a chunk overlap"""
+    def word_key(word):
+        return re.sub(r'\W+', '', word.lower())
+
+    words = []
+    for part in parts:
+        part_words = part.split()
+        overlap = 0
+        for size in range(min(max_overlap_words, len(words), len(part_words)), 0, -1):
+            if [word_key(w) for w in words[-size:]] == [word_key(w) for w in part_words[:size]]:
+                overlap = size
+                break
+        words.extend(part_words[overlap:])
+    return " ".join(words)
+
+def transcribe_audio(audio_path, max_retries=5, retry_delay=5, progress=None):
+    """Transcribe an audio file, chunking long recordings so latency follows chunk length"""
+    progress = progress or (lambda message: None)
+    duration = probe_duration(audio_path)
+    if not duration or duration <= TRANSCRIBE_CHUNK_SECONDS + TRANSCRIBE_CHUNK_SLACK:
+        progress("Uploading audio for transcription")
+        return whisper_transcribe_file(audio_path, max_retries, retry_delay, progress)
+
+    progress("Splitting audio")
+    segments = plan_audio_segments(duration, detect_silences(audio_path))
+    chunk_dir = tempfile.mkdtemp(prefix="scicheck-chunks-")
+    try:
+        chunk_paths = [
+            cut_audio_segment(audio_path, start, end, os.path.join(chunk_dir, f"{index:04d}.mp3"))
+            for index, (start, end) in enumerate(segments)
+        ]
+        logging.info(f"Transcribing {duration / 60:.1f} min of audio as {len(chunk_paths)} chunks")
+        progress(f"Transcribing {len(chunk_paths)} chunks")
+
+        futures = {TRANSCRIBE_EXECUTOR.submit(transcribe_audio_chunk, path, max_retries, retry_delay): index
+                   for index, path in enumerate(chunk_paths)}
+        texts = [None] * len(chunk_paths)
+        failed = 0
+        for done, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            try:
+                texts[index] = future.result()
+            except Exception as e:
+                failed += 1
+                logging.error(f"Chunk {index + 1}/{len(chunk_paths)} of {audio_path} failed: {e}")
+            progress(f"Transcribed {done} of {len(chunk_paths)} chunks")
+
+        if failed:
+            raise ValueError(f"{failed} of {len(chunk_paths)} audio chunks could not be transcribed; "
+                             "retrying will only redo those chunks")
+        transcription = stitch_transcripts(texts)
+        if not transcription:
+            raise ValueError("No transcription returned from Whisper API")
+        return transcription
+    finally:
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+
+def transcribe_video(video_path, max_retries=5, retry_delay=5, progress=None):
     """Transcribe uploaded video using Whisper API"""
+    progress = progress or (lambda message: None)
+    audio_path = video_path + ".mp3"
     try:
-        WHISPER_API_KEY = os.getenv("WHISPER_API_KEY")
-        if not WHISPER_API_KEY:
+        if not os.getenv("WHISPER_API_KEY"):
             raise ValueError("WHISPER_API_KEY is not set in environment variables.")
 
-        audio_path = video_path + ".mp3"
-        video_clip = VideoFileClip(video_path)
-        video_clip.audio.write_audiofile(audio_path)
-        video_clip.close()
-
-        with open(audio_path, "rb") as audio_file:
-            files = {"file": audio_file}
-            headers = {"X-API-Key": WHISPER_API_KEY}
-            data = {
-                "format": "text",
-                "language": "en",
-                "model_size": "base"
-            }
-
-            response = requests.post(
-                "https://api.whisper-api.com/transcribe",
-                files=files,
-                headers=headers,
-                data=data,
-                timeout=120
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("status") == "pending":
-                    task_id = result.get("task_id")
-                    if not task_id:
-                        raise ValueError("No task_id returned for pending transcription")
-                    return poll_transcription_status(task_id, WHISPER_API_KEY, max_retries, retry_delay)
-                transcription = result.get("result", "")
-                if not transcription:
-                    raise ValueError("No transcription returned from Whisper API")
-                return transcription
-            else:
-                raise ValueError(f"Whisper API error: {response.status_code} - {response.text}")
+        progress("Extracting audio")
+        extract_audio(video_path, audio_path)
+        return transcribe_audio(audio_path, max_retries, retry_delay, progress)
 
     except requests.exceptions.RequestException as e:
         raise ValueError(f"Network error: Failed to connect to transcription service")
     except Exception as e:
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
         raise ValueError(f"Failed to transcribe video: {str(e)}")
     finally:
         if os.path.exists(audio_path):
             os.remove(audio_path)
 
-def transcribe_from_url(video_url, max_retries=5, retry_delay=5):
+def transcribe_from_url(video_url, max_retries=5, retry_delay=5, progress=None):
     """Transcribe video URL using Whisper API"""
+    progress = progress or (lambda message: None)
+    audio_path = None
     try:
-        WHISPER_API_KEY = os.getenv("WHISPER_API_KEY")
-        if not WHISPER_API_KEY:
+        if not os.getenv("WHISPER_API_KEY"):
             raise ValueError("WHISPER_API_KEY is not set in environment variables.")
 
         ydl_opts = {
-            'format': 'bestaudio/best',
+            'format': 'bestaudio[abr<=128]/bestaudio/best',  # speech needs no high-bitrate audio
             'outtmpl': '/tmp/%(id)s.%(ext)s',
             'postprocessors': [{
                 'key': 'FFmpegExtractAudio',
                 'preferredcodec': 'mp3',
-                'preferredquality': '192',
+                'preferredquality': AUDIO_BITRATE.rstrip('k'),
             }],
+            # Same speech-sized output as uploaded videos: mono, 16 kHz
+            'postprocessor_args': {'extractaudio': ['-ac', '1', '-ar', str(AUDIO_SAMPLE_RATE)]},
             'quiet': True
         }
 
+        progress("Downloading audio")
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(video_url, download=True)
             audio_path = ydl.prepare_filename(info).rsplit('.', 1)[0] + '.mp3'
 
-        with open(audio_path, "rb") as audio_file:
-            files = {"file": audio_file}
-            headers = {"X-API-Key": WHISPER_API_KEY}
-            data = {
-                "format": "text",
-                "language": "en",
-                "model_size": "base"
-            }
-
-            response = requests.post(
-                "https://api.whisper-api.com/transcribe",
-                files=files,
-                headers=headers,
-                data=data,
-                timeout=120
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("status") == "pending":
-                    task_id = result.get("task_id")
-                    if not task_id:
-                        raise ValueError("No task_id returned for pending transcription")
-                    return poll_transcription_status(task_id, WHISPER_API_KEY, max_retries, retry_delay)
-                transcription = result.get("result", "")
-                if not transcription:
-                    raise ValueError("No transcription returned from Whisper API")
-                return transcription
-            else:
-                raise ValueError(f"Whisper API error: {response.status_code} - {response.text}")
+        return transcribe_audio(audio_path, max_retries, retry_delay, progress)
 
     except requests.exceptions.RequestException as e:
         raise ValueError(f"Network error: Failed to connect to transcription service")
     except Exception as e:
-        if 'audio_path' in locals() and os.path.exists(audio_path):
-            os.remove(audio_path)
         raise ValueError(f"Failed to transcribe video URL: {str(e)}")
     finally:
-        if 'audio_path' in locals() and os.path.exists(audio_path):
+        if audio_path and os.path.exists(audio_path):
             os.remove(audio_path)
 
-def poll_transcription_status(task_id, api_key, max_retries, retry_delay):
+def poll_transcription_status(task_id, api_key, max_retries, retry_delay, progress=None):
     """Poll for transcription status until completion or max retries"""
     headers = {"X-API-Key": api_key}
     for attempt in range(max_retries):
+        if progress:
+            progress(f"Transcribing (check {attempt + 1} of {max_retries})")
         try:
-            response = requests.get(
+            response = HTTP_SESSION.get(
                 f"https://api.whisper-api.com/transcribe/{task_id}",
                 headers=headers,
                 timeout=30
@@ -824,108 +2284,369 @@ def poll_transcription_status(task_id, api_key, max_retries, retry_delay):
                 time.sleep(retry_delay)
     raise ValueError("Transcription timed out after maximum retries")
 
-def save_uploaded_file(file, upload_folder="/home/scicheckagent/mysite/uploads"):
-    """Save uploaded file and return path"""
+# Background jobs: long video work runs off the request thread, clients poll /api/jobs/<id>.
+# A job is a row with everything needed to run it, so any worker process can claim it and
+# jobs queued or running when a worker recycles are picked up again.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_STALE_SECONDS = 900  # a running job with no progress for this long lost its worker
+JOB_MAX_ATTEMPTS = 2     # runs of a job before a lost worker marks it failed instead of requeueing
+JOB_POLL_INTERVAL = 2.0
+
+_job_workers_pid = None
+_job_workers_lock = threading.Lock()
+_job_wakeup = threading.Event()
+
+def update_job(job_id, status=None, progress=None, error=None):
+    """Record a job's status/progress; also serves as its heartbeat"""
+    conn = get_db()
+    conn.execute("""
+    UPDATE jobs SET status = COALESCE(?, status), progress = COALESCE(?, progress),
+                    error = COALESCE(?, error), updated_at = CURRENT_TIMESTAMP
+    WHERE job_id = ?
+    """, (status, progress, error, job_id))
+    conn.commit()
+
+def get_job(job_id):
+    """Return a job row as a dict, or None; a job that lost its worker too often is reported failed"""
+    row = get_db().execute("""
+    SELECT job_id, kind, media_key, status, progress, error,
+           status = 'running' AND updated_at < datetime('now', ?), attempts
+    FROM jobs WHERE job_id = ?
+    """, (f"-{JOB_STALE_SECONDS} seconds", job_id)).fetchone()
+    if not row:
+        return None
+    job = dict(zip(("job_id", "kind", "media_key", "status", "progress", "error"), row[:6]))
+    if row[6]:
+        if row[7] >= JOB_MAX_ATTEMPTS:
+            job["status"] = "failed"
+            job["error"] = "Job was interrupted before it finished. Please try again."
+        else:
+            # About to be requeued by the next worker that polls
+            job["status"] = "queued"
+            job["progress"] = "Waiting for a worker"
+    return job
+
+def remove_job_upload(payload):
+    """Delete the uploaded file a job was working on, once the job is finished either way"""
+    upload_path = (payload or {}).get("upload_path")
+    if upload_path:
+        try:
+            os.remove(upload_path)
+        except OSError:
+            pass
+
+def submit_job(kind, media_key, payload):
+    """Queue a job for a background worker, reusing an active job for the same media.
+
+    Returns (job_id, created). The check and the insert share one write transaction, so two
+    requests for the same media cannot both create a job.
+    """
+    conn = get_db()
+    conn.execute("BEGIN IMMEDIATE")
     try:
-        os.makedirs(upload_folder, exist_ok=True)
-        filename = str(uuid.uuid4()) + "_" + file.filename
-        filepath = os.path.join(upload_folder, filename)
-        file.save(filepath)
-        return filepath
-    except Exception as e:
-        logging.error(f"Error saving uploaded file: {e}")
+        active = conn.execute("""
+        SELECT job_id FROM jobs
+        WHERE media_key = ? AND (status = 'queued' OR (status = 'running' AND updated_at >= datetime('now', ?)))
+        ORDER BY created_at DESC LIMIT 1
+        """, (media_key, f"-{JOB_STALE_SECONDS} seconds")).fetchone()
+        if active:
+            conn.commit()
+            return active[0], False
+
+        job_id = str(uuid.uuid4())
+        conn.execute("""
+        INSERT INTO jobs (job_id, kind, media_key, status, progress, payload_json)
+        VALUES (?, ?, ?, 'queued', 'Waiting for a worker', ?)
+        """, (job_id, kind, media_key, json_dumps(payload)))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    ensure_job_workers()
+    _job_wakeup.set()
+    return job_id, True
+
+def claim_next_job():
+    """Take the oldest queued job for this worker, or None.
+
+    Running jobs whose worker went silent are requeued first, or failed once they have used
+    up JOB_MAX_ATTEMPTS.
+    """
+    conn = get_db()
+    stale = f"-{JOB_STALE_SECONDS} seconds"
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("""
+        UPDATE jobs SET status = 'queued', progress = 'Waiting for a worker', updated_at = CURRENT_TIMESTAMP
+        WHERE status = 'running' AND updated_at < datetime('now', ?) AND attempts < ?
+        """, (stale, JOB_MAX_ATTEMPTS))
+        abandoned = conn.execute("""
+        SELECT job_id, payload_json FROM jobs
+        WHERE status = 'running' AND updated_at < datetime('now', ?)
+        """, (stale,)).fetchall()
+        conn.executemany("""
+        UPDATE jobs SET status = 'failed', error = 'Job was interrupted before it finished. Please try again.',
+                        updated_at = CURRENT_TIMESTAMP
+        WHERE job_id = ?
+        """, [(job_id,) for job_id, _ in abandoned])
+
+        row = conn.execute("""
+        SELECT job_id, kind, media_key, payload_json FROM jobs
+        WHERE status = 'queued' ORDER BY created_at LIMIT 1
+        """).fetchone()
+        if row:
+            conn.execute("""
+            UPDATE jobs SET status = 'running', progress = 'Starting', attempts = attempts + 1,
+                            updated_at = CURRENT_TIMESTAMP
+            WHERE job_id = ?
+            """, (row[0],))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    for _, payload_json in abandoned:
+        remove_job_upload(json_loads(payload_json, {}))
+    if not row:
         return None
+    return {"job_id": row[0], "kind": row[1], "media_key": row[2], "payload": json_loads(row[3], {})}
+
+def run_video_job(job, progress):
+    transcription = transcribe_video(job["payload"]["upload_path"], progress=progress)
+    store_media_cache(job["media_key"], 'video', transcription)
+
+def run_video_url_job(job, progress):
+    transcription = transcribe_from_url(job["payload"]["video_url"], progress=progress)
+    store_media_cache(job["media_key"], 'video_url', transcription)
+
+JOB_HANDLERS = {
+    "video": run_video_job,
+    "video_url": run_video_url_job,
+}
+
+def run_job(job):
+    """Run a claimed job and record its outcome"""
+    job_id = job["job_id"]
+    try:
+        handler = JOB_HANDLERS.get(job["kind"])
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {job['kind']}")
+        handler(job, lambda message: update_job(job_id, progress=message))
+        update_job(job_id, status="completed", progress="Done")
+    except Exception as e:
+        logging.error(f"Job {job_id} failed: {e}")
+        try:
+            get_db().rollback()
+            update_job(job_id, status="failed", error=str(e))
+        except Exception as db_error:
+            logging.error(f"Could not record failure of job {job_id}: {db_error}")
+    finally:
+        remove_job_upload(job["payload"])
+
+def job_worker_loop():
+    while True:
+        try:
+            job = claim_next_job()
+        except Exception as e:
+            logging.error(f"Could not claim a job: {e}")
+            job = None
+        if job is None:
+            _job_wakeup.wait(JOB_POLL_INTERVAL)
+            _job_wakeup.clear()
+            continue
+        run_job(job)
+
+def ensure_job_workers():
+    """Start this process's job worker threads (again after a fork)"""
+    global _job_workers_pid, _job_wakeup
+    if _job_workers_pid == os.getpid():
+        return
+    with _job_workers_lock:
+        if _job_workers_pid == os.getpid():
+            return
+        _job_wakeup = threading.Event()
+        for i in range(JOB_WORKERS):
+            threading.Thread(target=job_worker_loop, name=f"job-{i}", daemon=True).start()
+        _job_workers_pid = os.getpid()
+
+@app.before_request
+def start_job_workers():
+    """Any request to a fresh worker process resumes jobs left queued by a recycled one"""
+    ensure_job_workers()
+
+# Uploads: werkzeug's multipart parser writes each file once, straight into UPLOAD_FOLDER,
+# and the SHA-256 is computed on the way so the cache can be checked without re-reading it
+UPLOAD_FOLDER = os.getenv("SCICHECK_UPLOAD_DIR", "/home/scicheckagent/mysite/uploads")
+UPLOAD_WRITE_BUFFER = 1024 * 1024
+UPLOAD_SUFFIX_RE = re.compile(r'^\.[A-Za-z0-9]{1,10}$')
+
+class HashingUploadFile:
+    """File-like upload target that hashes everything written to it"""
+
+    def __init__(self, directory, suffix=""):
+        os.makedirs(directory, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=directory, prefix="upload-", suffix=suffix,
+                                                 delete=False, buffering=UPLOAD_WRITE_BUFFER)
+        self.path = self._file.name
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.sha256.update(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+class UploadHashingRequest(Request):
+    """Request whose file uploads stream to disk through HashingUploadFile"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        suffix = os.path.splitext(filename or "")[1]
+        upload = HashingUploadFile(UPLOAD_FOLDER, suffix if UPLOAD_SUFFIX_RE.match(suffix) else "")
+        g.setdefault("pending_uploads", []).append(upload)
+        return upload
+
+app.request_class = UploadHashingRequest
+
+def claim_upload(file_storage):
+    """Return (path, sha256) of an uploaded file; the caller becomes responsible for removing it"""
+    upload = file_storage.stream
+    upload.close()
+    pending = g.get("pending_uploads", [])
+    if upload in pending:
+        pending.remove(upload)
+    return upload.path, upload.sha256.hexdigest()
+
+@app.teardown_request
+def remove_unclaimed_uploads(exc):
+    """Delete uploads that no route claimed (rejected or failed requests)"""
+    for upload in g.pop("pending_uploads", []):
+        try:
+            upload.close()
+            os.remove(upload.path)
+        except OSError:
+            pass
+
+# Text normalization: each replacement table is compiled once into a single regex
+# (multi-character keys first, then one character class) applied in one pass
+DISPLAY_REPLACEMENTS = {
+    # Dashes and hyphens - comprehensive coverage
+    '–': '-', '—': '-', '―': '-', '‒': '-', '‐': '-', '‑': '-',
+    '−': '-', '–': '-', '—': '-', '―': '-', '': '-', '': '-',
+
+    # Smart quotes and apostrophes
+    '‘': "'", '’': "'", '‚': "'", '‛': "'",
+    '“': '"', '”': '"', '„': '"', '‟': '"',
+    '´': "'", '`': "'", 'ʻ': "'", 'ʼ': "'",
+    '«': '"', '»': '"', '‹': "'", '›': "'",
+
+    # Mathematical symbols and special characters
+    '°': ' degrees ', '±': '+/-', '×': 'x', '÷': '/',
+    '≈': '~', '≠': '!=', '≤': '<=', '≥': '>=',
+    'µ': 'u', 'α': 'alpha', 'β': 'beta', 'γ': 'gamma',
+    'δ': 'delta', 'ε': 'epsilon', 'θ': 'theta',
+
+    # Common problematic encodings
+    '': '', '': '', '': '', '': '', '': '',
+    '': '', '': '', '': '', '': '', '': '',
+    '': '', '': '', '': '', '': '', '': '',
+    '': '', '': '', '': '', '': '', '': '',
+    '': '', '': '', '': '', '': '', '': '',
+    '': '', '': '', '': '', '': '', '': '',
+    '': '', '': '',
+
+    # Spaces and invisible characters
+    '\u200b': '', '\ufeff': '', '\u202a': '', '\u202c': '',
+    '\u200e': '', '\u200f': '', ' ': ' ', ' ': ' ',
+    ' ': ' ', '': '', '': '', '\xa0': ' ',
+}
+
+PDF_REPLACEMENTS = {
+    # Convert Greek letters to text for PDF compatibility
+    'α': 'alpha', 'β': 'beta', 'γ': 'gamma', 'δ': 'delta',
+    'ε': 'epsilon', 'ζ': 'zeta', 'η': 'eta', 'θ': 'theta',
+    'ι': 'iota', 'κ': 'kappa', 'λ': 'lambda', 'μ': 'mu',
+    'ν': 'nu', 'ξ': 'xi', 'ο': 'omicron', 'π': 'pi',
+    'ρ': 'rho', 'σ': 'sigma', 'τ': 'tau', 'υ': 'upsilon',
+    'φ': 'phi', 'χ': 'chi', 'ψ': 'psi', 'ω': 'omega',
+    'Α': 'Alpha', 'Β': 'Beta', 'Γ': 'Gamma', 'Δ': 'Delta',
+    'Ε': 'Epsilon', 'Ζ': 'Zeta', 'Η': 'Eta', 'Θ': 'Theta',
+    'Ι': 'Iota', 'Κ': 'Kappa', 'Λ': 'Lambda', 'Μ': 'Mu',
+    'Ν': 'Nu', 'Ξ': 'Xi', 'Ο': 'Omicron', 'Π': 'Pi',
+    'Ρ': 'Rho', 'Σ': 'Sigma', 'Τ': 'Tau', 'Υ': 'Upsilon',
+    'Φ': 'Phi', 'Χ': 'Chi', 'Ψ': 'Psi', 'Ω': 'Omega',
+
+    # Fix common formatting issues
+    '<br>': '\n', '<br/>': '\n', '<br />': '\n',
+    '<b>': '**', '</b>': '**', '<i>': '*', '</i>': '*',
+    '<em>': '*', '</em>': '*', '<strong>': '**', '</strong>': '**',
+    '<p>': '\n', '</p>': '\n', '<para>': '', '</para>': '',
+}
+
+# Control characters stripped after display normalization
+DISPLAY_CONTROL_CHARS = [*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), *range(0x7F, 0xA0)]
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+EXCESS_NEWLINES_RE = re.compile(r'\n{3,}')
+BR_TAG_RE = re.compile(r'<br\s*/?>')
+HTML_ENTITY_RE = re.compile(r'&[^;]+;')
+BLANK_LINES_RE = re.compile(r'\n\s*\n')
+
+def build_normalizer(replacements, delete_chars=()):
+    """Compile a replacement dict into (pattern, mapping, ascii_table) for apply_normalizer"""
+    mapping = {chr(codepoint): '' for codepoint in delete_chars}
+    mapping.update((old, new) for old, new in replacements.items() if old)
+    multi = sorted((key for key in mapping if len(key) > 1), key=len, reverse=True)
+    singles = ''.join(re.escape(key) for key in mapping if len(key) == 1)
+    alternatives = [re.escape(key) for key in multi] + ([f'[{singles}]'] if singles else [])
+    # Pure-ASCII input can use str.translate's fast path when no ASCII key spans several characters
+    ascii_table = None
+    if not any(key.isascii() for key in multi):
+        ascii_table = str.maketrans({key: new for key, new in mapping.items() if key.isascii()})
+    return re.compile('|'.join(alternatives)), mapping, ascii_table
+
+def apply_normalizer(text, normalizer):
+    """Apply every replacement of a compiled normalizer in a single scan"""
+    pattern, mapping, ascii_table = normalizer
+    if ascii_table is not None and text.isascii():
+        return text.translate(ascii_table)
+    return pattern.sub(lambda m: mapping[m.group(0)], text)
+
+def strip_html_tags(text):
+    """Remove <...> tags; only text up to the last '>' can contain one, which keeps
+    unmatched '<' characters (e.g. from '<=') from rescanning the rest of the text"""
+    end = text.rfind('>') + 1
+    if not end:
+        return text
+    return HTML_TAG_RE.sub('', text[:end]) + text[end:]
+
+DISPLAY_NORMALIZER = build_normalizer(DISPLAY_REPLACEMENTS, DISPLAY_CONTROL_CHARS)
+PDF_NORMALIZER = build_normalizer(PDF_REPLACEMENTS)
 
 def normalize_text_for_display(text):
     """Normalize text for HTML display with comprehensive character handling"""
     if not text:
         return text
 
-    # Normalize Unicode first
-    normalized = unicodedata.normalize('NFKC', text)  # Changed to NFKC for more aggressive normalization
-
-    # Comprehensive replacements for display
-    replacements = {
-        # Dashes and hyphens - comprehensive coverage
-        '–': '-', '—': '-', '―': '-', '‒': '-', '‐': '-', '‑': '-',
-        '−': '-', '–': '-', '—': '-', '―': '-', '': '-', '': '-',
-
-        # Smart quotes and apostrophes
-        '‘': "'", '’': "'", '‚': "'", '‛': "'",
-        '“': '"', '”': '"', '„': '"', '‟': '"',
-        '´': "'", '`': "'", 'ʻ': "'", 'ʼ': "'",
-        '«': '"', '»': '"', '‹': "'", '›': "'",
-
-        # Mathematical symbols and special characters
-        '°': ' degrees ', '±': '+/-', '×': 'x', '÷': '/',
-        '≈': '~', '≠': '!=', '≤': '<=', '≥': '>=',
-        'µ': 'u', 'α': 'alpha', 'β': 'beta', 'γ': 'gamma',
-        'δ': 'delta', 'ε': 'epsilon', 'θ': 'theta',
-
-        # Common problematic encodings
-        '': '', '': '', '': '', '': '', '': '',
-        '': '', '': '', '': '', '': '', '': '',
-        '': '', '': '', '': '', '': '', '': '',
-        '': '', '': '', '': '', '': '', '': '',
-        '': '', '': '', '': '', '': '', '': '',
-        '': '', '': '', '': '', '': '', '': '',
-        '': '', '': '',
-
-        # Spaces and invisible characters
-        '\u200b': '', '\ufeff': '', '\u202a': '', '\u202c': '',
-        '\u200e': '', '\u200f': '', ' ': ' ', ' ': ' ',
-        ' ': ' ', '': '', '': '', '\xa0': ' ',
-    }
-
-    for old, new in replacements.items():
-        normalized = normalized.replace(old, new)
-
-    # Remove any remaining problematic control characters
-    normalized = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]', '', normalized)
+    # NFKC leaves pure ASCII untouched, so skip it for the common case
+    if not text.isascii():
+        text = unicodedata.normalize('NFKC', text)
 
-    return normalized
+    # Replacements and control-character removal in one pass
+    return apply_normalizer(text, DISPLAY_NORMALIZER)
 
 def normalize_text_for_pdf(text):
     """Normalize text specifically for PDF generation with strict HTML cleaning"""
     if not text:
         return text
 
-    # First apply display normalization
-    text = normalize_text_for_display(text)
-
-    # Additional PDF-specific replacements
-    pdf_replacements = {
-        # Convert Greek letters to text for PDF compatibility
-        'α': 'alpha', 'β': 'beta', 'γ': 'gamma', 'δ': 'delta',
-        'ε': 'epsilon', 'ζ': 'zeta', 'η': 'eta', 'θ': 'theta',
-        'ι': 'iota', 'κ': 'kappa', 'λ': 'lambda', 'μ': 'mu',
-        'ν': 'nu', 'ξ': 'xi', 'ο': 'omicron', 'π': 'pi',
-        'ρ': 'rho', 'σ': 'sigma', 'τ': 'tau', 'υ': 'upsilon',
-        'φ': 'phi', 'χ': 'chi', 'ψ': 'psi', 'ω': 'omega',
-        'Α': 'Alpha', 'Β': 'Beta', 'Γ': 'Gamma', 'Δ': 'Delta',
-        'Ε': 'Epsilon', 'Ζ': 'Zeta', 'Η': 'Eta', 'Θ': 'Theta',
-        'Ι': 'Iota', 'Κ': 'Kappa', 'Λ': 'Lambda', 'Μ': 'Mu',
-        'Ν': 'Nu', 'Ξ': 'Xi', 'Ο': 'Omicron', 'Π': 'Pi',
-        'Ρ': 'Rho', 'Σ': 'Sigma', 'Τ': 'Tau', 'Υ': 'Upsilon',
-        'Φ': 'Phi', 'Χ': 'Chi', 'Ψ': 'Psi', 'Ω': 'Omega',
-
-        # Fix common formatting issues
-        '<br>': '\n', '<br/>': '\n', '<br />': '\n',
-        '<b>': '**', '</b>': '**', '<i>': '*', '</i>': '*',
-        '<em>': '*', '</em>': '*', '<strong>': '**', '</strong>': '**',
-        '<p>': '\n', '</p>': '\n', '<para>': '', '</para>': '',
-    }
-
-    for old, new in pdf_replacements.items():
-        text = text.replace(old, new)
+    # First apply display normalization, then PDF-specific replacements
+    text = apply_normalizer(normalize_text_for_display(text), PDF_NORMALIZER)
 
     # Clean up any remaining HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
+    text = strip_html_tags(text)
 
     # Fix multiple newlines
-    text = re.sub(r'\n{3,}', '\n\n', text)
-
-    return text
+    return EXCESS_NEWLINES_RE.sub('\n\n', text)
 
 def clean_html_for_reportlab(text):
     """Clean HTML but preserve table structure for PDF"""
@@ -936,15 +2657,15 @@ def clean_html_for_reportlab(text):
     text = normalize_text_for_pdf(text)
 
     # Remove problematic HTML but keep table-related structure
-    text = re.sub(r'<br\s*/?>', '\n', text)
-    text = re.sub(r'<[^>]+>', '', text)  # Remove all other HTML tags
+    text = BR_TAG_RE.sub('\n', text)
+    text = strip_html_tags(text)  # Remove all other HTML tags
 
     # Fix common issues
-    text = re.sub(r'&[^;]+;', '', text)
-    text = re.sub(r'\xa0', ' ', text)
+    text = HTML_ENTITY_RE.sub('', text)
+    text = text.replace('\xa0', ' ')
 
     # Ensure proper spacing
-    text = re.sub(r'\n\s*\n', '\n\n', text)
+    text = BLANK_LINES_RE.sub('\n\n', text)
 
     return text.strip()
 
@@ -1017,75 +2738,229 @@ def split_long_report(report_content, max_section_length=1500):
 
     return sections
 
-def draw_paragraph(pdf_canvas, text_content, style, y_pos, page_width, left_margin=0.75*inch, right_margin=0.75*inch):
-    """Safe paragraph drawing with better page management"""
-    available_width = page_width - left_margin - right_margin
+# PDF rendering (ReportLab platypus): styles are built once per process
+PDF_MARGIN = 0.75 * inch
+PDF_CONTENT_WIDTH = A4[0] - 2 * PDF_MARGIN
+PDF_STREAM_CHUNK_SIZE = 64 * 1024
 
-    # Clean the text but keep it simple - NO TABLE CONVERSION!
-    text_content = clean_html_for_reportlab(text_content)
+def build_pdf_styles():
+    """Build the stylesheet used by every PDF export"""
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='ReportTitle', parent=styles['Title'], fontName='Helvetica-Bold', fontSize=20, leading=24, alignment=TA_CENTER, spaceAfter=20))
+    styles.add(ParagraphStyle(name='ClaimHeading', parent=styles['h2'], fontName='Helvetica-Bold', fontSize=14, spaceAfter=6))
+    styles.add(ParagraphStyle(name='SectionHeading', parent=styles['h3'], fontName='Helvetica-Bold', fontSize=12, spaceAfter=4, textColor=colors.darkblue))
+    styles.add(ParagraphStyle(name='NormalParagraph', parent=styles['Normal'], fontName='Helvetica', fontSize=10, leading=12, spaceAfter=8))
+    styles.add(ParagraphStyle(name='SourceLink', parent=styles['NormalParagraph'], textColor=colors.blue, fontName='Helvetica', fontSize=9, leading=10, spaceAfter=4))
+    styles.add(ParagraphStyle(name='ReportBody', parent=styles['NormalParagraph'], fontName='Helvetica', fontSize=10, leading=14, spaceAfter=10))
+    return styles
 
-    # Replace newlines with <br/> for Paragraph
-    text_content = text_content.replace('\n', '<br/>')
+PDF_STYLES = build_pdf_styles()
 
+def pdf_paragraph(text_content, style):
+    """Clean a text fragment once and wrap it in a Paragraph flowable"""
+    text_content = clean_html_for_reportlab(text_content) or ""
     try:
-        para = Paragraph(text_content, style)
-        w, h = para.wrapOn(pdf_canvas, available_width, 0)
+        return Paragraph(text_content.replace('\n', '<br/>'), style)
+    except Exception as e:
+        logging.warning(f"Paragraph markup rejected, falling back to plain text: {e}")
+        # Fallback to escaped text so no content is lost
+        return Paragraph(xml_escape(text_content).replace('\n', '<br/>'), style)
 
-        # Check if we need a new page - be more conservative
-        if y_pos - h < 1.5 * inch:  # Increased bottom margin
-            pdf_canvas.showPage()
-            y_pos = A4[1] - 0.75 * inch
+def build_pdf_story(pdf_reports):
+    """Turn export items into a list of platypus flowables"""
+    styles = PDF_STYLES
+    story = [Paragraph("epistemiq Analysis Report", styles['ReportTitle'])]
 
-        para.drawOn(pdf_canvas, left_margin, y_pos - h)
-        return y_pos - h - style.spaceAfter
+    for item in pdf_reports:
+        story.append(Spacer(1, 20))
 
-    except Exception as e:
-        logging.warning(f"Paragraph drawing failed: {e}")
-        # Fallback to simple text
-        return draw_simple_text(pdf_canvas, text_content, y_pos, page_width, left_margin)
+        # Claim heading
+        story.append(pdf_paragraph(f"Claim: {item['claim_text']}", styles['ClaimHeading']))
 
-def draw_simple_text(pdf_canvas, text_content, y_pos, page_width, left_margin):
-    """Fallback text drawing that ensures no content is lost"""
-    pdf_canvas.setFont("Helvetica", 9)
-    line_height = 11
-    lines = text_content.replace('<br/>', '\n').split('\n')
+        # Model verdict
+        if item['model_verdict']:
+            story.append(pdf_paragraph(f"<b>Model Verdict:</b> {item.get('model_verdict','')}", styles['NormalParagraph']))
 
-    for line in lines:
-        # Simple line wrapping
-        if len(line) > 120:
-            words = line.split()
-            current_line = ""
-            for word in words:
-                test_line = current_line + word + " "
-                if len(test_line) < 120:
-                    current_line = test_line
-                else:
-                    # Draw current line
-                    if y_pos < 1.5 * inch:
-                        pdf_canvas.showPage()
-                        y_pos = A4[1] - 0.75 * inch
-                        pdf_canvas.setFont("Helvetica", 9)
-                    pdf_canvas.drawString(left_margin, y_pos, current_line.strip())
-                    y_pos -= line_height
-                    current_line = word + " "
-            # Draw remaining line
-            if current_line:
-                if y_pos < 1.5 * inch:
-                    pdf_canvas.showPage()
-                    y_pos = A4[1] - 0.75 * inch
-                    pdf_canvas.setFont("Helvetica", 9)
-                pdf_canvas.drawString(left_margin, y_pos, current_line.strip())
-                y_pos -= line_height
-        else:
-            # Draw single line
-            if y_pos < 1.5 * inch:
-                pdf_canvas.showPage()
-                y_pos = A4[1] - 0.75 * inch
-                pdf_canvas.setFont("Helvetica", 9)
-            pdf_canvas.drawString(left_margin, y_pos, line.strip())
-            y_pos -= line_height
+        # External verdict
+        if item['external_verdict']:
+            story.append(pdf_paragraph(f"<b>External Verdict:</b> {item.get('external_verdict','')}", styles['NormalParagraph']))
+
+        # Sources (if any)
+        if item.get('sources'):
+            story.append(pdf_paragraph("<b>External Sources:</b>", styles['SectionHeading']))
+            for src in item.get('sources', []):
+                story.append(pdf_paragraph(f"- {src.get('title','')}", styles['SourceLink']))
+
+        # Question heading
+        story.append(pdf_paragraph(f"<b>Research Question:</b> {item.get('question','')}", styles['SectionHeading']))
 
-    return y_pos
+        # Full report if present
+        if item.get('report'):
+            story.append(pdf_paragraph("<b>AI Research Report:</b>", styles['SectionHeading']))
+
+            sections = split_long_report(item['report'])
+            for i, section in enumerate(sections):
+                for block_type, block_content in process_report_content_for_pdf(section):
+                    if block_type == "text":
+                        if block_content.strip():
+                            story.append(pdf_paragraph(block_content, styles['ReportBody']))
+                    elif block_type == "table":
+                        table_data = parse_markdown_table(block_content)
+                        table = create_table_from_data(table_data, PDF_CONTENT_WIDTH) if table_data else None
+                        if table:
+                            story.append(table)
+                            story.append(Spacer(1, 10))
+
+                # Add spacing between sections
+                if i < len(sections) - 1:
+                    story.append(Spacer(1, 10))
+
+    return story
+
+def render_pdf_to_file(pdf_reports, path):
+    """Lay out the export with SimpleDocTemplate, writing the PDF straight to disk"""
+    doc = SimpleDocTemplate(
+        path,
+        pagesize=A4,
+        leftMargin=PDF_MARGIN,
+        rightMargin=PDF_MARGIN,
+        topMargin=inch,
+        bottomMargin=inch,
+        title="epistemiq Analysis Report",
+    )
+    doc.build(build_pdf_story(pdf_reports))
+
+def stream_file(f, chunk_size=PDF_STREAM_CHUNK_SIZE):
+    """Yield an open binary file in chunks, closing it once sent"""
+    try:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            yield chunk
+    finally:
+        f.close()
+
+def pdf_file_response(path, remove_after=False):
+    """Stream a rendered PDF as a download. The file is opened up front so eviction cannot race the send."""
+    f = open(path, "rb")
+    size = os.fstat(f.fileno()).st_size
+    if remove_after:
+        os.remove(path)  # the open handle keeps the data readable
+    return Response(
+        stream_file(f),
+        mimetype='application/pdf',
+        headers={
+            "Content-Disposition": 'attachment; filename="epistemiq_AI_Report.pdf"',
+            "Content-Length": str(size),
+        },
+    )
+
+# Rendered-PDF cache: content-addressed files on disk with size-bounded LRU eviction
+PDF_CACHE_DIR = os.getenv("SCICHECK_PDF_CACHE_DIR", '/home/scicheckagent/mysite/pdf_cache')
+PDF_CACHE_MAX_BYTES = int(os.getenv("SCICHECK_PDF_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+PDF_RENDER_VERSION = "1"  # bump when the layout changes so old renders are not served
+
+def pdf_cache_key(pdf_reports):
+    """Hash of the ordered report IDs plus the hashes of every text that ends up in the PDF"""
+    digest = hashlib.sha256(PDF_RENDER_VERSION.encode("utf-8"))
+    for item in pdf_reports:
+        digest.update(json_dumps([
+            item["id"],
+            sha256_str(item["claim_text"]),
+            sha256_str(item["model_verdict"]),
+            sha256_str(item["external_verdict"]),
+            sha256_str(json_dumps(item["sources"])),
+            sha256_str(item["question"]),
+            sha256_str(item["report"] or ""),
+        ]).encode("utf-8"))
+    return digest.hexdigest()
+
+def pdf_cache_path(cache_key):
+    return os.path.join(PDF_CACHE_DIR, f"{cache_key}.pdf")
+
+def get_cached_pdf(cache_key):
+    """Path of a cached render, marked as recently used, or None"""
+    path = pdf_cache_path(cache_key)
+    try:
+        os.utime(path)
+        return path
+    except OSError:
+        return None
+
+def store_rendered_pdf(cache_key, pdf_reports):
+    """Render into the cache directory, record which claims it depends on, and evict old renders.
+
+    Returns the download response. A render larger than the whole cache is sent from its
+    temporary file without being cached, since eviction would delete it straight away.
+    """
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        render_pdf_to_file(pdf_reports, tmp_path)
+        if os.path.getsize(tmp_path) > PDF_CACHE_MAX_BYTES:
+            logging.info(f"PDF export of {os.path.getsize(tmp_path)} bytes exceeds the cache, not caching it")
+            return pdf_file_response(tmp_path, remove_after=True)
+        os.replace(tmp_path, pdf_cache_path(cache_key))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    # Opened before eviction runs, so a concurrent eviction cannot pull the file from under us
+    response = pdf_file_response(pdf_cache_path(cache_key))
+
+    conn = get_db()
+    conn.executemany("INSERT OR IGNORE INTO pdf_cache_deps (cache_key, claim_hash) VALUES (?, ?)",
+                     [(cache_key, sha256_str(item["claim_text"].strip().lower())) for item in pdf_reports])
+    conn.commit()
+
+    evict_pdf_cache()
+    return response
+
+def evict_pdf_cache(max_bytes=PDF_CACHE_MAX_BYTES):
+    """Delete least recently used renders until the cache fits in max_bytes"""
+    try:
+        entries = []
+        for entry in os.scandir(PDF_CACHE_DIR):
+            if entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path, entry.name[:-4]))
+    except OSError as e:
+        logging.warning(f"PDF cache scan failed: {e}")
+        return
+
+    total = sum(size for _, size, _, _ in entries)
+    evicted = []
+    for _, size, path, cache_key in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        evicted.append(cache_key)
+
+    if evicted:
+        conn = get_db()
+        for placeholders, chunk in sql_in_chunks(evicted):
+            conn.execute(f"DELETE FROM pdf_cache_deps WHERE cache_key IN ({placeholders})", chunk)
+        conn.commit()
+        logging.info(f"Evicted {len(evicted)} cached PDF exports")
+
+def invalidate_pdf_cache(claim_hash):
+    """Drop cached renders that include a claim whose verdict, sources or reports changed"""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute("SELECT cache_key FROM pdf_cache_deps WHERE claim_hash=?", (claim_hash,))
+    cache_keys = [row[0] for row in c.fetchall()]
+    if not cache_keys:
+        return
+    for cache_key in cache_keys:
+        try:
+            os.remove(pdf_cache_path(cache_key))
+        except OSError:
+            pass
+    for placeholders, chunk in sql_in_chunks(cache_keys):
+        c.execute(f"DELETE FROM pdf_cache_deps WHERE cache_key IN ({placeholders})", chunk)
 
 def parse_markdown_table(markdown_text):
     """Parse markdown table and return data for ReportLab Table"""
@@ -1144,8 +3019,97 @@ def create_table_from_data(table_data, available_width):
 
     return table
 
+def parse_report_id(report_id):
+    """'claim-3-summary' -> (3, None), 'claim-3-question-1' -> (3, 1), None if malformed"""
+    try:
+        parts = report_id.split('-')
+        if report_id.endswith('-summary'):
+            return int(parts[1]), None
+        if 'question' in report_id:
+            return int(parts[1]), int(parts[3])
+    except (AttributeError, IndexError, ValueError):
+        pass
+    return None
+
+def load_export_reports(analysis_id, selected_reports):
+    """Bulk-load the claims, verdicts, sources and report texts behind the selected report IDs.
+
+    Returns the PDF report items in selection order, skipping duplicates and unknown IDs.
+    """
+    selected = []
+    seen_ids = set()
+    for report_id in selected_reports:
+        ref = parse_report_id(report_id)
+        if ref is None or report_id in seen_ids:
+            continue
+        seen_ids.add(report_id)
+        selected.append((report_id, *ref))
+    if not selected:
+        return []
+
+    c = get_db().cursor()
+
+    # ordinal -> (claim_text, model_verdict, questions_json, external_verdict, sources_json)
+    claims = {}
+    for placeholders, chunk in sql_in_chunks(sorted({ordinal for _, ordinal, _ in selected})):
+        c.execute(f"""
+        SELECT c.ordinal, c.claim_text, m.verdict, m.questions_json, e.verdict, e.sources_json
+        FROM claims c
+        LEFT JOIN model_cache m ON m.claim_hash = c.claim_hash
+        LEFT JOIN external_cache e ON e.claim_hash = c.claim_hash
+        WHERE c.analysis_id=? AND c.ordinal IN ({placeholders})
+        """, [analysis_id, *chunk])
+        for row in c.fetchall():
+            claims[row[0]] = row[1:]
+
+    # report_id -> (question_text, rq_hash) for question reports whose question exists
+    questions = {}
+    for report_id, ordinal, q_idx in selected:
+        if q_idx is None or ordinal not in claims:
+            continue
+        claim_questions = json_loads(claims[ordinal][2], [])
+        if 0 <= q_idx < len(claim_questions):
+            question_text = claim_questions[q_idx]
+            questions[report_id] = (question_text, report_hash(claims[ordinal][0], question_text))
+
+    report_texts = {}
+    for placeholders, chunk in sql_in_chunks({rq_hash for _, rq_hash in questions.values()}):
+        c.execute(f"SELECT rq_hash, report_text FROM report_cache WHERE rq_hash IN ({placeholders})", chunk)
+        report_texts.update(c.fetchall())
+
+    pdf_reports = []
+    for report_id, ordinal, q_idx in selected:
+        if ordinal not in claims:
+            continue
+        claim_text, model_verdict, _, external_verdict, sources_json = claims[ordinal]
+
+        if q_idx is None:
+            pdf_reports.append({
+                "id": report_id,
+                "claim_text": claim_text,
+                "model_verdict": model_verdict or "",
+                "external_verdict": external_verdict if external_verdict is not None else "Not verified externally.",
+                "sources": json_loads(sources_json, []) if external_verdict is not None else [],
+                "question": "Model verdict + external verification",
+                "report": None
+            })
+        elif report_id in questions and questions[report_id][1] in report_texts:
+            question_text, rq_hash = questions[report_id]
+            pdf_reports.append({
+                "id": report_id,
+                "claim_text": claim_text,
+                "model_verdict": "",
+                "external_verdict": "",
+                "sources": [],
+                "question": question_text,
+                "report": report_texts[rq_hash]
+            })
+    return pdf_reports
+
 # API Endpoints
 
+# Templates: db.html is deployed as templates/index.html (the root index.html is flask_app.py's UI)
+
 @app.route("/")
 def home_redirect():
     return redirect(url_for('analyze_page'))
@@ -1202,47 +3166,67 @@ def analyze():
 
     if not text or not mode:
         return jsonify({"error": "Missing text or analysis mode."}), 400
+    if mode not in extraction_templates:
+        return jsonify({"error": f"Unknown analysis mode: {mode}"}), 400
 
     # Create new analysis
     analysis_id = new_analysis_id()
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
+    conn = get_db()
     c = conn.cursor()
     c.execute("INSERT INTO analyses (analysis_id, mode) VALUES (?, ?)", (analysis_id, mode))
     conn.commit()
-    conn.close()
 
     session['analysis_id'] = analysis_id
     session['mode'] = mode
 
-    extraction_prompt = extraction_templates[mode].format(text=text)
+    if data.get("stream"):
+        # Each claim is saved before it is sent, so the client can request its details right away
+        def stream_claims():
+            yield f"data: {json.dumps({'analysis_id': analysis_id})}\n\n"
+            lease_key, lease_owner, holds_lease = None, new_lease_owner(), False
+            try:
+                text_hash, cache_key = extraction_cache_key(text, mode)
+                cached_claims = get_extraction_cache(cache_key)
+                if cached_claims is None:
+                    # Same lease as extract_claims_cached: concurrent requests for this text
+                    # wait for one extraction and replay its cached result
+                    lease_key = extraction_lease_key(cache_key)
+                    cached_claims, holds_lease = wait_for_lease_or_result(
+                        lease_key, lease_owner, lambda: get_extraction_cache(cache_key))
+                if cached_claims is not None:
+                    save_claims_for_analysis(analysis_id, cached_claims)
+                    for idx, claim in enumerate(cached_claims):
+                        yield f"data: {json.dumps({'claim_idx': idx, 'claim': claim, 'cached': True})}\n\n"
+                else:
+                    claims_list, failed_chunks = [], []
+                    for claim in iter_extracted_claims(text, mode, failed_chunks):
+                        add_claim_to_analysis(analysis_id, len(claims_list), claim)
+                        yield f"data: {json.dumps({'claim_idx': len(claims_list), 'claim': claim, 'cached': False})}\n\n"
+                        claims_list.append(claim)
+                    if not failed_chunks:
+                        store_extraction_cache(cache_key, text_hash, text, mode, claims_list)
+            except Exception as e:
+                logging.error(f"Failed to extract claims: {e}")
+                yield f"data: {json.dumps({'error': f'Failed to extract claims: {str(e)}'})}\n\n"
+            finally:
+                # Also runs when the client disconnects mid-stream
+                if holds_lease:
+                    release_lease(lease_key, lease_owner)
+            yield "data: [DONE]\n\n"
+        return Response(stream_claims(), mimetype="text/event-stream")
 
     try:
-        res = call_openrouter(extraction_prompt)
-        raw_claims = res.json()["choices"][0]["message"]["content"]
-
-        if "No explicit claims found" in raw_claims or not raw_claims.strip():
-            return jsonify({"claims": []})
-
-        claims_list = []
-        for line in raw_claims.splitlines():
-            stripped_line = line.strip()
-            if stripped_line and stripped_line[0].isdigit():
-                content_start = 0
-                while content_start < len(stripped_line) and (stripped_line[content_start].isdigit() or stripped_line[content_start] in ['.', ' ']):
-                    content_start += 1
-                if content_start < len(stripped_line):
-                    claims_list.append(stripped_line[content_start:].strip())
-            elif stripped_line:
-                claims_list.append(stripped_line)
-
-        claims_list = [c for c in claims_list if len(c) > 10 and not c.lower().startswith(("output:", "text:", "no explicit claims found"))]
+        claims_list, cached = extract_claims_cached(text, mode)
+        if not claims_list:
+            return jsonify({"claims": [], "cached": cached})
 
         # Save claims to database
         save_claims_for_analysis(analysis_id, claims_list)
 
         return jsonify({
             "claims": claims_list,
-            "analysis_id": analysis_id
+            "analysis_id": analysis_id,
+            "cached": cached
         })
 
     except Exception as e:
@@ -1259,58 +3243,142 @@ def get_claim_details():
     if analysis_id is None or ordinal is None:
         return jsonify({"error": "Missing analysis or claim index"}), 400
 
-    # 1) Get the claim text
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
-    c = conn.cursor()
-    c.execute("SELECT claim_text FROM claims WHERE analysis_id=? AND ordinal=?", (analysis_id, int(ordinal)))
-    row = c.fetchone()
-    conn.close()
-    if not row:
+    # 1) Get the claim text and any cached model result in one lookup
+    bundle = lookup_claim_bundle(analysis_id, int(ordinal), need=("model",))
+    if not bundle:
         return jsonify({"error": "Claim not found"}), 404
 
-    claim_text = row[0]
-    ch = sha256_str(claim_text.strip().lower())
+    claim_text = bundle["claim_text"]
+    ch = bundle["claim_hash"]
 
     # 2) Hit model_cache
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
-    c = conn.cursor()
-    c.execute("SELECT verdict, questions_json, keywords_json FROM model_cache WHERE claim_hash=?", (ch,))
-    hit = c.fetchone()
-    conn.close()
+    if bundle["model"]:
+        return jsonify({**bundle["model"], "cached": True})
 
-    if hit:
-        return jsonify({
-            "model_verdict": hit[0],
-            "questions": json_loads(hit[1], []),
-            "search_keywords": json_loads(hit[2], []),
-            "cached": True
-        })
+    # 3) Compute and store in model_cache; concurrent misses for the same claim share one computation
+    try:
+        return jsonify(model_details_single_flight(ch, claim_text, mode))
+    except Exception as e:
+        logging.error(f"Failed to generate claim details: {e}")
+        return jsonify({"error": f"Failed to generate claim details: {str(e)}"}), 500
 
-    # 3) Compute using existing logic
-    verdict_prompt = verification_prompts[(mode if mode in verification_prompts else 'General Analysis of Testable Claims')].format(claim=claim_text)
-    model_verdict_content, questions, search_keywords = generate_model_verdict_and_questions(verdict_prompt, claim_text)
+@app.route("/api/get-claim-details-batch", methods=["POST"])
+def get_claim_details_batch():
+    """Model verdicts for many claims of the current analysis: cache hits in one query, misses batched into few prompts."""
+    payload = request.json or {}
+    analysis_id = session.get("analysis_id")
+    mode = session.get("mode") or "General Analysis of Testable Claims"
 
-    # 4) Store in model_cache
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
+    if analysis_id is None:
+        return jsonify({"error": "Missing analysis"}), 400
+
+    wanted = payload.get("claim_indices")
+    try:
+        wanted = {int(idx) for idx in wanted} if wanted is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "claim_indices must be a list of integers"}), 400
+
+    conn = get_db()
     c = conn.cursor()
     c.execute("""
-    INSERT INTO model_cache (claim_hash, verdict, questions_json, keywords_json, updated_at)
-    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-    ON CONFLICT(claim_hash) DO UPDATE SET
-    verdict=excluded.verdict,
-    questions_json=excluded.questions_json,
-    keywords_json=excluded.keywords_json,
-    updated_at=CURRENT_TIMESTAMP
-    """, (ch, model_verdict_content, json_dumps(questions or []), json_dumps(search_keywords or [])))
-    conn.commit()
-    conn.close()
+    SELECT c.ordinal, c.claim_text, c.claim_hash, m.verdict, m.questions_json, m.keywords_json
+    FROM claims c
+    LEFT JOIN model_cache m ON m.claim_hash = c.claim_hash
+    WHERE c.analysis_id=?
+    ORDER BY c.ordinal
+    """, (analysis_id,))
+    rows = [row for row in c.fetchall() if wanted is None or row[0] in wanted]
+
+    if not rows:
+        return jsonify({"error": "Claim not found"}), 404
 
-    return jsonify({
-        "model_verdict": model_verdict_content,
-        "questions": questions or [],
-        "search_keywords": search_keywords or [],
-        "cached": False
-    })
+    cached_results = []
+    misses = {}  # claim_hash -> (claim_text, [ordinals])
+    for ordinal, claim_text, ch, verdict, questions_json, keywords_json in rows:
+        if verdict is not None:
+            cached_results.append({
+                "claim_idx": ordinal,
+                "model_verdict": verdict,
+                "questions": json_loads(questions_json, []),
+                "search_keywords": json_loads(keywords_json, []),
+                "cached": True
+            })
+        else:
+            misses.setdefault(ch, (claim_text, []))[1].append(ordinal)
+
+    def resolve_batches():
+        # Lease every missed claim like /api/get-claim-details does, so concurrent analyses of
+        # the same text batch each claim once; claims leased elsewhere are waited on instead
+        owner = new_lease_owner()
+        leased, contended = {}, {}
+        try:
+            for ch, (claim_text, ordinals) in misses.items():
+                if not acquire_lease(model_lease_key(ch), owner):
+                    contended[ch] = (claim_text, ordinals)
+                    continue
+                hit = get_model_cache(ch)
+                if hit:
+                    # Finished by another worker between our query and taking the lease
+                    release_lease(model_lease_key(ch), owner)
+                    for ordinal in ordinals:
+                        yield {"claim_idx": ordinal, **hit, "cached": True}
+                    continue
+                leased[ch] = (claim_text, ordinals)
+
+            batches = pack_claim_batches([(ch, claim_text) for ch, (claim_text, _) in leased.items()])
+            # future -> claims it answers; a batched response that misses claims is followed by
+            # concurrent single-claim completions for just those claims
+            pending = {LLM_EXECUTOR.submit(generate_batch_verdicts, batch, mode): batch for batch in batches}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                verdicts = {}
+                for future in done:
+                    batch = pending.pop(future)
+                    verdicts.update(future.result())
+                    for ch, claim_text in batch:
+                        if ch not in verdicts:
+                            # Mapped to () so a single-claim fallback never falls back again
+                            pending[LLM_EXECUTOR.submit(generate_single_verdicts, [(ch, claim_text)], mode)] = ()
+                for ch, (model_verdict_content, questions, search_keywords) in verdicts.items():
+                    store_model_cache(ch, model_verdict_content, questions, search_keywords)
+                    release_lease(model_lease_key(ch), owner)
+                    for ordinal in leased[ch][1]:
+                        yield {
+                            "claim_idx": ordinal,
+                            "model_verdict": model_verdict_content,
+                            "questions": questions or [],
+                            "search_keywords": search_keywords or [],
+                            "cached": False
+                        }
+        finally:
+            for ch in leased:
+                release_lease(model_lease_key(ch), owner)
+
+        for ch, (claim_text, ordinals) in contended.items():
+            details = model_details_single_flight(ch, claim_text, mode)
+            for ordinal in ordinals:
+                yield {**details, "claim_idx": ordinal}
+
+    if payload.get("stream"):
+        def stream_results():
+            for result in cached_results:
+                yield f"data: {json.dumps(result)}\n\n"
+            try:
+                for result in resolve_batches():
+                    yield f"data: {json.dumps(result)}\n\n"
+            except Exception as e:
+                logging.error(f"Batched claim details failed: {e}")
+                yield f"data: {json.dumps({'error': 'Failed to generate claim details'})}\n\n"
+            yield "data: [DONE]\n\n"
+        return Response(stream_results(), mimetype="text/event-stream")
+
+    try:
+        results = cached_results + list(resolve_batches())
+    except Exception as e:
+        logging.error(f"Batched claim details failed: {e}")
+        return jsonify({"error": f"Failed to generate claim details: {str(e)}"}), 500
+    results.sort(key=lambda r: r["claim_idx"])
+    return jsonify({"results": results})
 
 @app.route("/api/verify-external", methods=["POST"])
 def verify_external():
@@ -1321,72 +3389,53 @@ def verify_external():
     if analysis_id is None or ordinal is None:
         return jsonify({"error": "Missing analysis or claim index"}), 400
 
-    # 1) get claim text
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
-    c = conn.cursor()
-    c.execute("SELECT claim_text FROM claims WHERE analysis_id=? AND ordinal=?", (analysis_id, int(ordinal)))
-    row = c.fetchone()
-    conn.close()
-    if not row:
+    # 1) get claim text, cached external result and model keywords in one lookup
+    bundle = lookup_claim_bundle(analysis_id, int(ordinal), need=("external",))
+    if not bundle:
         return jsonify({"error": "Claim not found"}), 404
 
-    claim_text = row[0]
-    ch = sha256_str(claim_text.strip().lower())
+    claim_text = bundle["claim_text"]
+    ch = bundle["claim_hash"]
 
     # 2) check external_cache
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
-    c = conn.cursor()
-    c.execute("SELECT verdict, sources_json FROM external_cache WHERE claim_hash=?", (ch,))
-    hit = c.fetchone()
-    conn.close()
-
-    if hit:
-        return jsonify({"verdict": hit[0], "sources": json_loads(hit[1], []), "cached": True})
-
-    # 3) build keywords; if model_cache has them, reuse
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
-    c = conn.cursor()
-    c.execute("SELECT keywords_json FROM model_cache WHERE claim_hash=?", (ch,))
-    kw_row = c.fetchone()
-    conn.close()
-
-    search_keywords = json_loads(kw_row[0], []) if kw_row else []
-    if not search_keywords:
-        import re
-        words = re.findall(r'\b[a-zA-Z]{4,}\b', claim_text.lower())
-        search_keywords = list(set(words[:5])) or [claim_text.lower()[:50]]
-
-    # 4) fetch sources (existing functions)
-    all_sources = []
-    all_sources.extend(fetch_semantic_scholar(search_keywords))
-    time.sleep(1.1)
-    all_sources.extend(fetch_crossref(search_keywords))
-    time.sleep(0.5)
-    all_sources.extend(fetch_core(search_keywords))
-    time.sleep(0.5)
-    all_sources.extend(fetch_pubmed(search_keywords))
-
-    # de-dup by URL
-    seen, unique_sources = set(), []
-    for s in all_sources:
-        url = s.get("url") or ""
-        if url and url not in seen:
-            unique_sources.append(s)
-            seen.add(url)
-
-    # 5) create external verdict with OpenRouter call
-    if unique_sources:
-        abstracts_and_titles = "\n\n".join(
-            f"Title: {s.get('title','No title')}\n"
-            f"Abstract: {s.get('abstract','Abstract not available')}\n"
-            f"Authors: {s.get('authors','')}\n"
-            f"Year: {s.get('year','')}\n"
-            f"Citations: {s.get('citation_count',0)}\n"
-            f"Source: {s.get('source','Unknown')}"
-            for s in unique_sources if s.get('title')
-        )
+    if bundle["external"]:
+        return jsonify({**bundle["external"], "cached": True})
+
+    def lookup():
+        hit = get_external_cache(ch)
+        return {**hit, "cached": True} if hit else None
+
+    def compute():
+        # 3) build keywords; if model_cache has them, reuse
+        search_keywords = bundle["model"]["search_keywords"] if bundle["model"] else []
+        if not search_keywords:
+            search_keywords = fallback_keywords(claim_text)
+
+        # 4) fetch sources from all providers concurrently
+        missed_providers = []
+        all_sources = fetch_all_sources(search_keywords, missed_providers=missed_providers)
+
+        # de-dup by URL
+        seen, unique_sources = set(), []
+        for s in all_sources:
+            url = s.get("url") or ""
+            if url and url not in seen:
+                unique_sources.append(s)
+                seen.add(url)
+
+        # 5) create external verdict with OpenRouter call
+        if unique_sources:
+            abstracts_and_titles = "\n\n".join(
+                f"Title: {s.get('title','No title')}\n"
+                f"Abstract: {s.get('abstract','Abstract not available')}\n"
+                f"Authors: {s.get('authors','')}\n"
+                f"Year: {s.get('year','')}\n"
+                f"Citations: {s.get('citation_count',0)}\n"
+                f"Source: {s.get('source','Unknown')}"
+                for s in unique_sources if s.get('title')
+            )
 
-        prompt = f"""You are an AI assistant evaluating a claim based on provided scientific paper information.
+            prompt = f"""You are an AI assistant evaluating a claim based on provided scientific paper information.
 
 Claim: "{claim_text}"
 
@@ -1395,30 +3444,31 @@ Papers:
 
 Return a short verdict and concise justification."""
 
-        try:
-            verdict_res = call_openrouter(prompt)
-            external_verdict = verdict_res.json()["choices"][0]["message"]["content"]
-        except Exception as e:
-            logging.error(f"External verdict failed: {e}")
-            external_verdict = "Could not generate external verdict."
-    else:
-        external_verdict = "No relevant scientific papers found for this claim."
+            try:
+                verdict_res = call_openrouter(prompt)
+                external_verdict = verdict_res.json()["choices"][0]["message"]["content"]
+            except Exception as e:
+                logging.error(f"External verdict failed: {e}")
+                external_verdict = "Could not generate external verdict."
+                missed_providers.append("OpenRouter")
+        else:
+            external_verdict = "No relevant scientific papers found for this claim."
 
-    # 6) store in external_cache
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
-    c = conn.cursor()
-    c.execute("""
-    INSERT INTO external_cache (claim_hash, verdict, sources_json, updated_at)
-    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-    ON CONFLICT(claim_hash) DO UPDATE SET
-    verdict=excluded.verdict,
-    sources_json=excluded.sources_json,
-    updated_at=CURRENT_TIMESTAMP
-    """, (ch, external_verdict, json_dumps(unique_sources)))
-    conn.commit()
-    conn.close()
+        # 6) store in external_cache, unless a provider or the verdict call was skipped, timed out
+        # or failed: an incomplete result must not stand in for this claim for the retention period
+        if missed_providers:
+            logging.info(f"Not caching external verdict for {ch}: missed {', '.join(missed_providers)}")
+        else:
+            store_external_cache(ch, external_verdict, unique_sources)
 
-    return jsonify({"verdict": external_verdict, "sources": unique_sources, "cached": False})
+        return {"verdict": external_verdict, "sources": unique_sources, "cached": False}
+
+    # Concurrent misses for the same claim share one literature search
+    try:
+        return jsonify(single_flight(f"external:{ch}", lookup, compute))
+    except Exception as e:
+        logging.error(f"External verification failed: {e}")
+        return jsonify({"error": f"Failed to verify claim externally: {str(e)}"}), 500
 
 @app.route("/api/process-image", methods=["POST"])
 def process_image():
@@ -1431,13 +3481,16 @@ def process_image():
         if image_file.filename == '':
             return jsonify({"error": "No image file selected"}), 400
 
-        # Save the uploaded image temporarily to compute hash
-        image_path = save_uploaded_file(image_file)
-        if not image_path:
-            return jsonify({"error": "Failed to save image"}), 500
-
-        # Compute file hash and check cache
-        file_hash = compute_file_hash(image_path)
+        try:
+            ocr_options = parse_ocr_options(request.form)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+
+        # The upload was hashed while it streamed to disk; check the cache before any work
+        image_path, file_hash = claim_upload(image_file)
+        if (ocr_options["psm"], ocr_options["oem"]) != (OCR_DEFAULT_PSM, OCR_DEFAULT_OEM):
+            # Non-default tesseract settings produce different text; cache them separately
+            file_hash = sha256_str(f"{file_hash}:psm={ocr_options['psm']}:oem={ocr_options['oem']}")
         cached_text = get_cached_media(file_hash)
         if cached_text:
             try:
@@ -1447,7 +3500,7 @@ def process_image():
             return jsonify({"extracted_text": cached_text, "cached": True})
 
         # Extract text using OCR if not cached
-        extracted_text = analyze_image_with_ocr(image_path)
+        extracted_text = analyze_image_with_ocr(image_path, **ocr_options)
 
         # Store in cache
         if extracted_text:
@@ -1479,13 +3532,8 @@ def process_video():
         if video_file.filename == '':
             return jsonify({"error": "No video file selected"}), 400
 
-        # Save the uploaded video temporarily to compute hash
-        video_path = save_uploaded_file(video_file)
-        if not video_path:
-            return jsonify({"error": "Failed to save video"}), 500
-
-        # Compute file hash and check cache
-        file_hash = compute_file_hash(video_path)
+        # The upload was hashed while it streamed to disk; check the cache before any work
+        video_path, file_hash = claim_upload(video_file)
         cached_transcription = get_cached_media(file_hash)
         if cached_transcription:
             try:
@@ -1494,20 +3542,23 @@ def process_video():
                 pass
             return jsonify({"transcription": cached_transcription, "cached": True})
 
-        # Transcribe video if not cached
-        transcription = transcribe_video(video_path)
-
-        # Store in cache
-        if transcription:
-            store_media_cache(file_hash, 'video', transcription)
-
-        # Clean up the uploaded file
+        # Transcribe in the background; the client polls /api/jobs/<job_id>.
+        # The job owns the upload from here and removes it when it finishes.
         try:
-            os.remove(video_path)
-        except:
-            pass
-
-        return jsonify({"transcription": transcription, "cached": False})
+            job_id, created = submit_job('video', file_hash, {"upload_path": video_path})
+        except Exception:
+            try:
+                os.remove(video_path)
+            except OSError:
+                pass
+            raise
+        if not created:
+            # The same video is already being transcribed
+            try:
+                os.remove(video_path)
+            except OSError:
+                pass
+        return jsonify({"job_id": job_id, "status": "queued", "cached": False}), 202
 
     except ValueError as ve:
         return jsonify({"error": str(ve)}), 400
@@ -1524,8 +3575,14 @@ def transcribe_video_url():
         if not video_url:
             return jsonify({"error": "No video URL provided"}), 400
 
-        transcription = transcribe_from_url(video_url)
-        return jsonify({"transcription": transcription})
+        url_hash = sha256_str(video_url.strip())
+        cached_transcription = get_cached_media(url_hash)
+        if cached_transcription:
+            return jsonify({"transcription": cached_transcription, "cached": True})
+
+        # Download and transcribe in the background; the client polls /api/jobs/<job_id>
+        job_id, _ = submit_job('video_url', url_hash, {"video_url": video_url})
+        return jsonify({"job_id": job_id, "status": "queued", "cached": False}), 202
 
     except ValueError as ve:
         return jsonify({"error": str(ve)}), 400
@@ -1533,66 +3590,32 @@ def transcribe_video_url():
         logging.error(f"Error in transcribe_video_url endpoint: {e}")
         return jsonify({"error": f"Failed to transcribe video URL: {str(e)}"}), 500
 
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """Report the status of a background job, with its result once completed"""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found."}), 404
+
+    payload = {"job_id": job_id, "status": job["status"], "progress": job["progress"]}
+    if job["status"] == "completed":
+        transcription = get_cached_media(job["media_key"])
+        if transcription is None:
+            payload.update(status="failed", error="Job result has expired. Please submit it again.")
+        else:
+            payload["transcription"] = transcription
+    elif job["status"] == "failed":
+        payload["error"] = job["error"]
+    return jsonify(payload)
 
-@app.route("/api/generate-report", methods=["POST"])
-def generate_report():
-    claim_idx = request.json.get("claim_idx")
-    question_idx = request.json.get("question_idx")
-    analysis_id = session.get("analysis_id")
-
-    if analysis_id is None:
-        return Response(json.dumps({"error": "Analysis context missing. Please re-run analysis."}), mimetype='application/json', status=400)
-
-    # Get claim text
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
-    c = conn.cursor()
-    c.execute("SELECT claim_text FROM claims WHERE analysis_id=? AND ordinal=?", (analysis_id, int(claim_idx)))
-    row = c.fetchone()
-
-    if not row:
-        conn.close()
-        return Response(json.dumps({"error": "Claim not found"}), mimetype='application/json', status=404)
-
-    claim_text = row[0]
-
-    # Get question_text from model_cache using claim_hash
-    claim_hash = sha256_str(claim_text.strip().lower())
-    c.execute("SELECT questions_json FROM model_cache WHERE claim_hash=?", (claim_hash,))
-    questions_row = c.fetchone()
-
-    if not questions_row:
-        conn.close()
-        return Response(json.dumps({"error": "Questions not found for this claim. Please generate model verdict first."}), mimetype='application/json', status=400)
-
-    questions = json_loads(questions_row[0], [])
-
-    if question_idx >= len(questions):
-        conn.close()
-        return Response(json.dumps({"error": f"Question index {question_idx} out of range. Only {len(questions)} questions available."}), mimetype='application/json', status=400)
-
-    question_text = questions[question_idx]
-    conn.close()
-
-    rq_hash = sha256_str((claim_text.strip().lower() + "||" + question_text.strip().lower()))
-
-    # Hit cache
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
-    c = conn.cursor()
-    c.execute("SELECT report_text FROM report_cache WHERE rq_hash=?", (rq_hash,))
-    hit = c.fetchone()
-    conn.close()
-
-    if hit and hit[0]:
-        def stream_cached():
-            yield f"data: {json.dumps({'content': hit[0]})}\n\n"
-            yield "data: [DONE]\n\n"
-        return Response(stream_cached(), mimetype="text/event-stream")
 
+def build_report_prompt(claim_hash, claim_text, question_text):
+    """Research report prompt for a claim/question, with the claim's cached verdicts as context"""
     # Generate report content
     article_cache_data = {"text": "", "mode": session.get("mode", "General Analysis of Testable Claims")}
 
     # Get model verdict and external verdict from their caches
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
+    conn = get_db()
     c = conn.cursor()
     c.execute("SELECT verdict FROM model_cache WHERE claim_hash=?", (claim_hash,))
     model_row = c.fetchone()
@@ -1601,10 +3624,8 @@ def generate_report():
     c.execute("SELECT verdict FROM external_cache WHERE claim_hash=?", (claim_hash,))
     external_row = c.fetchone()
     external_verdict_content = external_row[0] if external_row else "Not yet externally verified."
-    conn.close()
 
-    # Define the prompt variable here (this was missing)
-    prompt = f'''
+    return f'''
 You are an AI researcher writing a short, evidence-based report (maximum 1000 words). Your task is to investigate the research question in relation to the claim using verifiable scientific knowledge. Use the article context to ground your analysis where helpful. Clearly explain how the answer to the research question supports, contradicts, or contextualizes the claim. Provide concise reasoning and avoid speculation.
 
 **CRITICAL FORMATTING REQUIREMENTS:**
@@ -1652,54 +3673,112 @@ You are an AI researcher writing a short, evidence-based report (maximum 1000 wo
 **AI Research Report**
 '''
 
+@app.route("/api/generate-report", methods=["POST"])
+def generate_report():
+    claim_idx = request.json.get("claim_idx")
+    question_idx = request.json.get("question_idx")
+    analysis_id = session.get("analysis_id")
+
+    if analysis_id is None:
+        return Response(json.dumps({"error": "Analysis context missing. Please re-run analysis."}), mimetype='application/json', status=400)
+
+    # Get claim text
+    conn = get_db()
+    c = conn.cursor()
+    c.execute("SELECT claim_text FROM claims WHERE analysis_id=? AND ordinal=?", (analysis_id, int(claim_idx)))
+    row = c.fetchone()
+
+    if not row:
+        return Response(json.dumps({"error": "Claim not found"}), mimetype='application/json', status=404)
+
+    claim_text = row[0]
+
+    # Get question_text from model_cache using claim_hash
+    claim_hash = sha256_str(claim_text.strip().lower())
+    c.execute("SELECT questions_json FROM model_cache WHERE claim_hash=?", (claim_hash,))
+    questions_row = c.fetchone()
+
+    if not questions_row:
+        return Response(json.dumps({"error": "Questions not found for this claim. Please generate model verdict first."}), mimetype='application/json', status=400)
+
+    questions = json_loads(questions_row[0], [])
+
+    if question_idx >= len(questions):
+        return Response(json.dumps({"error": f"Question index {question_idx} out of range. Only {len(questions)} questions available."}), mimetype='application/json', status=400)
+
+    question_text = questions[question_idx]
+
+    rq_hash = sha256_str((claim_text.strip().lower() + "||" + question_text.strip().lower()))
+
+    # Hit cache
+    def lookup():
+        conn = get_db()
+        c = conn.cursor()
+        c.execute("SELECT report_text FROM report_cache WHERE rq_hash=?", (rq_hash,))
+        hit = c.fetchone()
+        return hit[0] if hit and hit[0] else None
+
+    def stream_cached(report_text):
+        yield f"data: {json.dumps({'content': report_text})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    cached_report = lookup()
+    if cached_report:
+        return Response(stream_cached(cached_report), mimetype="text/event-stream")
+
+    # Only one worker streams a given report from the LLM; concurrent requests wait for its result
+    lease_key = f"report:{rq_hash}"
+    lease_owner = new_lease_owner()
+    cached_report, holds_lease = wait_for_lease_or_result(lease_key, lease_owner, lookup)
+    if cached_report:
+        if holds_lease:
+            release_lease(lease_key, lease_owner)
+        return Response(stream_cached(cached_report), mimetype="text/event-stream")
+
     def stream_response():
-        full_report_content = ""
+        report_parts = []
+        response = None
         try:
             response = call_openrouter(prompt, stream=True)
             response.raise_for_status()
 
-            for chunk in response.iter_content(chunk_size=1024, decode_unicode=True):
-                if chunk:
-                    lines = chunk.split('\n')
-                    for line in lines:
-                        line = line.strip()
-                        if line.startswith("data:"):
-                            data_part = line[5:].strip()  # Remove "data:"
-                            if data_part == '[DONE]':
-                                continue
-                            try:
-                                json_data = json.loads(data_part)
-                                if 'choices' in json_data and json_data['choices']:
-                                    content = json_data['choices'][0].get('delta', {}).get('content', '')
-                                    if content:
-                                        normalized_content = normalize_text_for_display(content)
-                                        full_report_content += normalized_content
-                                        yield f"data: {json.dumps({'content': normalized_content})}\n\n"
-                            except json.JSONDecodeError:
-                                continue
+            for content in iter_completion_deltas(response):
+                normalized_content = normalize_text_for_display(content)
+                report_parts.append(normalized_content)
+                yield f"data: {json.dumps({'content': normalized_content})}\n\n"
 
         except Exception as e:
             logging.error(f"Streaming error: {e}")
             yield f"data: {json.dumps({'error': 'Streaming failed'})}\n\n"
         finally:
+            # Return the pooled connection even if the client disconnected mid-stream
+            if response is not None:
+                response.close()
+
             # Store in cache only if we have meaningful content
+            full_report_content = "".join(report_parts)
             if full_report_content.strip():
                 try:
-                    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
-                    c = conn.cursor()
-                    c.execute("""
-                        INSERT OR REPLACE INTO report_cache
-                        (rq_hash, question_text, report_text, updated_at)
-                        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                    """, (rq_hash, question_text, full_report_content))  # These variables are now defined in the outer scope
-                    conn.commit()
-                    conn.close()
+                    store_report_cache(rq_hash, question_text, full_report_content, claim_hash, question_idx)
                 except Exception as db_error:
                     logging.error(f"Cache error: {db_error}")
+                    get_db().rollback()
 
         yield "data: [DONE]\n\n"
 
-    return Response(stream_response(), mimetype='text/event-stream')
+    handed_off = False
+    try:
+        prompt = build_report_prompt(claim_hash, claim_text, question_text)
+        streamed = Response(stream_response(), mimetype='text/event-stream')
+        if holds_lease:
+            # Runs once the stream is finished (and the report cached) or the client went away
+            streamed.call_on_close(lambda: release_lease(lease_key, lease_owner))
+        handed_off = True
+        return streamed
+    finally:
+        # Anything failing before the response owns the lease must not leave it held until it expires
+        if holds_lease and not handed_off:
+            release_lease(lease_key, lease_owner)
 
 
 @app.route("/api/available-reports", methods=["GET"])
@@ -1709,23 +3788,33 @@ def get_available_reports():
     if not analysis_id:
         return jsonify({"error": "No active analysis session found."}), 400
 
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
+    conn = get_db()
     c = conn.cursor()
 
-    # Get claims for this analysis
-    c.execute("SELECT ordinal, claim_text FROM claims WHERE analysis_id=? ORDER BY ordinal", (analysis_id,))
+    # Claims with their model_cache entries in one query
+    c.execute("""
+    SELECT c.ordinal, c.claim_text, c.claim_hash, m.claim_hash IS NOT NULL, m.questions_json
+    FROM claims c
+    LEFT JOIN model_cache m ON m.claim_hash = c.claim_hash
+    WHERE c.analysis_id=?
+    ORDER BY c.ordinal
+    """, (analysis_id,))
     claim_rows = c.fetchall()
 
+    # Which questions already have a report, from the materialized availability table
+    c.execute("""
+    SELECT claim_hash, question_idx, rq_hash FROM report_availability
+    WHERE claim_hash IN (SELECT claim_hash FROM claims WHERE analysis_id=?)
+    """, (analysis_id,))
+    available = {(row[0], row[1]): row[2] for row in c.fetchall()}
+
     available_reports = []
 
-    for ordinal, claim_text in claim_rows:
+    for ordinal, claim_text, claim_hash, has_model, questions_json in claim_rows:
         claim_text_preview = claim_text[:80] + '...' if len(claim_text) > 80 else claim_text
 
         # Add model verdict if available
-        claim_hash = sha256_str(claim_text.strip().lower())
-        c.execute("SELECT verdict FROM model_cache WHERE claim_hash=?", (claim_hash,))
-        model_row = c.fetchone()
-        if model_row:
+        if has_model:
             available_reports.append({
                 "id": f"claim-{ordinal}-summary",
                 "type": f"Claim {ordinal + 1} - Model Verdict & External Verification",
@@ -1733,22 +3822,14 @@ def get_available_reports():
             })
 
         # Add question reports if available
-        c.execute("SELECT questions_json FROM model_cache WHERE claim_hash=?", (claim_hash,))
-        questions_row = c.fetchone()
-        if questions_row:
-            questions = json_loads(questions_row[0], [])
-            for q_idx, question in enumerate(questions):
-                rq_hash = sha256_str((claim_text.strip().lower()+"||"+question.strip().lower()))
-                c.execute("SELECT report_text FROM report_cache WHERE rq_hash=?", (rq_hash,))
-                report_row = c.fetchone()
-                if report_row:
-                    available_reports.append({
-                        "id": f"claim-{ordinal}-question-{q_idx}",
-                        "type": f"Claim {ordinal + 1} - Question Report {q_idx + 1}",
-                        "description": f"Research report for: {question[:100]}..."
-                    })
-
-    conn.close()
+        for q_idx, question in enumerate(json_loads(questions_json, []) if has_model else []):
+            if available.get((claim_hash, q_idx)) == report_hash(claim_text, question):
+                available_reports.append({
+                    "id": f"claim-{ordinal}-question-{q_idx}",
+                    "type": f"Claim {ordinal + 1} - Question Report {q_idx + 1}",
+                    "description": f"Research report for: {question[:100]}..."
+                })
+
     return jsonify(available_reports)
 
 @app.route("/export-pdf", methods=["POST"])
@@ -1759,206 +3840,51 @@ def export_pdf():
     if not analysis_id:
         return "No active analysis session found. Please run an analysis first.", 400
 
-    conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
+    conn = get_db()
     c = conn.cursor()
 
-    # Get analysis mode
-    c.execute("SELECT mode FROM analyses WHERE analysis_id=?", (analysis_id,))
+    # Get analysis mode and whether it has any claims
+    c.execute("""
+    SELECT a.mode, EXISTS(SELECT 1 FROM claims WHERE analysis_id = a.analysis_id)
+    FROM analyses a WHERE a.analysis_id=?
+    """, (analysis_id,))
     analysis_row = c.fetchone()
     if not analysis_row:
         return "Analysis session expired or not found.", 400
 
-
-    # Get claims
-    c.execute("SELECT ordinal, claim_text FROM claims WHERE analysis_id=? ORDER BY ordinal", (analysis_id,))
-    claim_rows = c.fetchall()
-    conn.close()
-
-    if not claim_rows:
+    if not analysis_row[1]:
         return "No claims found for this analysis session.", 400
 
-    pdf_reports = []
-    added_ids = set()
-
-    # Process selected reports based on their IDs
-    for report_id in selected_reports:
-        if report_id in added_ids:
-            continue
-
-        if report_id.endswith('-summary'):
-            try:
-                claim_idx = int(report_id.split('-')[1])
-                for ordinal, claim_text in claim_rows:
-                    if ordinal == claim_idx:
-                        claim_hash = sha256_str(claim_text.strip().lower())
-
-                        conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
-                        c = conn.cursor()
-
-                        c.execute("SELECT verdict FROM model_cache WHERE claim_hash=?", (claim_hash,))
-                        model_row = c.fetchone()
-                        model_verdict = model_row[0] if model_row else ""
-
-                        c.execute("SELECT verdict, sources_json FROM external_cache WHERE claim_hash=?", (claim_hash,))
-                        external_row = c.fetchone()
-                        external_verdict = external_row[0] if external_row else "Not verified externally."
-                        sources = json_loads(external_row[1], []) if external_row else []
-
-                        conn.close()
-
-                        pdf_reports.append({
-                            "id": report_id,
-                            "claim_text": claim_text,
-                            "model_verdict": model_verdict,
-                            "external_verdict": external_verdict,
-                            "sources": sources,
-                            "question": "Model verdict + external verification",
-                            "report": None
-                        })
-                        added_ids.add(report_id)
-                        break
-            except (IndexError, ValueError) as e:
-                continue
-
-        elif 'question' in report_id:
-            try:
-                parts = report_id.split('-')
-                claim_idx = int(parts[1])
-                q_idx = int(parts[3])
-
-                for ordinal, claim_text in claim_rows:
-                    if ordinal == claim_idx:
-                        claim_hash = sha256_str(claim_text.strip().lower())
-
-                        conn = sqlite3.connect('/home/scicheckagent/mysite/sessions.db')
-                        c = conn.cursor()
-
-                        # Get question text
-                        c.execute("SELECT questions_json FROM model_cache WHERE claim_hash=?", (claim_hash,))
-                        questions_row = c.fetchone()
-                        if questions_row:
-                            questions = json_loads(questions_row[0], [])
-                            if q_idx < len(questions):
-                                question_text = questions[q_idx]
-
-                                # Get report
-                                rq_hash = sha256_str((claim_text.strip().lower()+"||"+question_text.strip().lower()))
-                                c.execute("SELECT report_text FROM report_cache WHERE rq_hash=?", (rq_hash,))
-                                report_row = c.fetchone()
-
-                                if report_row:
-                                    pdf_reports.append({
-                                        "id": report_id,
-                                        "claim_text": claim_text,
-                                        "model_verdict": "",
-                                        "external_verdict": "",
-                                        "sources": [],
-                                        "question": question_text,
-                                        "report": report_row[0]
-                                    })
-                                    added_ids.add(report_id)
-                        conn.close()
-                        break
-            except (IndexError, ValueError) as e:
-                continue
+    # Load every selected report in a few batched queries
+    pdf_reports = load_export_reports(analysis_id, selected_reports)
 
     if not pdf_reports:
         return "No valid reports selected for export.", 400
 
-    # PDF generation
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='ClaimHeading', parent=styles['h2'], fontName='Helvetica-Bold', fontSize=14, spaceAfter=6))
-    styles.add(ParagraphStyle(name='SectionHeading', parent=styles['h3'], fontName='Helvetica-Bold', fontSize=12, spaceAfter=4, textColor=colors.darkblue))
-    styles.add(ParagraphStyle(name='NormalParagraph', parent=styles['Normal'], fontName='Helvetica', fontSize=10, leading=12, spaceAfter=8))
-    styles.add(ParagraphStyle(name='SourceLink', parent=styles['NormalParagraph'], textColor=colors.blue, fontName='Helvetica', fontSize=9, leading=10, spaceAfter=4))
-    styles.add(ParagraphStyle(name='ReportBody', parent=styles['NormalParagraph'], fontName='Helvetica', fontSize=10, leading=14, spaceAfter=10))
-
-
-    y = height - inch
-
-    p.setFont("Helvetica-Bold", 20)
-    p.drawCentredString(width / 2.0, y, "epistemiq Analysis Report")
-    y -= 40
-
-    for item in pdf_reports:
-        if y < 1.5 * inch:
-            p.showPage()
-            y = height - inch
-
-        y -= 20
-
-        # Claim heading
-        y = draw_paragraph(p, f"Claim: {item['claim_text']}", styles['ClaimHeading'], y, width)
-
-        # Model verdict
-        if item['model_verdict']:
-            y = draw_paragraph(p, f"<b>Model Verdict:</b> {item.get('model_verdict','')}", styles['NormalParagraph'], y, width)
-
-        # External verdict
-        if item['external_verdict']:
-            y = draw_paragraph(p, f"<b>External Verdict:</b> {item.get('external_verdict','')}", styles['NormalParagraph'], y, width)
-
-        # Sources (if any)
-        if item.get('sources'):
-            y = draw_paragraph(p, "<b>External Sources:</b>", styles['SectionHeading'], y, width)
-            for src in item.get('sources', []):
-                link_text = f"{src.get('title','')}"
-                if src.get('url'):
-                    escaped_url = src['url'].replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
-                    link_text = f'<link href="{escaped_url}">{link_text}</link>'
-                y = draw_paragraph(p, f"- {link_text}", styles['SourceLink'], y, width)
+    # Repeat exports of unchanged content are served straight from the render cache
+    cache_key = pdf_cache_key(pdf_reports)
+    cached_path = get_cached_pdf(cache_key)
+    if cached_path:
+        try:
+            return pdf_file_response(cached_path)
+        except OSError:
+            pass  # evicted in the meantime; render again
 
-        # Question heading
-        y = draw_paragraph(p, f"<b>Research Question:</b> {item.get('question','')}", styles['SectionHeading'], y, width)
+    # PDF generation: lay out to a file, then stream it to the client in chunks
+    try:
+        return store_rendered_pdf(cache_key, pdf_reports)
+    except OSError as e:
+        logging.warning(f"PDF cache unavailable, rendering uncached: {e}")
 
-        # Full report if present
-        if item.get('report'):
-           y = draw_paragraph(p, "<b>AI Research Report:</b>", styles['SectionHeading'], y, width)
-
-           report_content = item['report']
-           sections = split_long_report(report_content)
-
-for i, section in enumerate(sections):
-    blocks = process_report_content_for_pdf(section)
-
-    for block_type, block_content in blocks:
-        if block_type == "text":
-            y = draw_paragraph(p, block_content, styles['ReportBody'], y, width)
-
-        elif block_type == "table":
-            table_data = parse_markdown_table(block_content)
-            if table_data:
-                table = create_table_from_data(table_data, width - 1.5 * inch)
-                if table:
-                    w, h = table.wrapOn(p, width - 1.5 * inch, y)
-                    if y - h < 1.5 * inch:
-                        p.showPage()
-                        y = A4[1] - 0.75 * inch
-                    try:
-                        table.drawOn(p, 0.75 * inch, y - h)
-                    except Exception as e:
-                        logging.error(f"Error drawing table: {e}")
-                    y -= h + 10
-
-    # Add spacing between sections
-    if i < len(sections) - 1:
-        y -= 10
-
-    # New page if near bottom
-    if y < 2 * inch:
-        p.showPage()
-        y = A4[1] - 0.75 * inch
-
-              y -= 20
-
-    p.save()
-    buffer.seek(0)
-
-    return send_file(buffer, mimetype='application/pdf', as_attachment=True, download_name="epistemiq_AI_Report.pdf")
+    fd, pdf_path = tempfile.mkstemp(prefix="epistemiq_", suffix=".pdf")
+    os.close(fd)
+    try:
+        render_pdf_to_file(pdf_reports, pdf_path)
+        return pdf_file_response(pdf_path, remove_after=True)
+    except Exception:
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
+        raise
 
 @app.route("/api/cleanup-cache", methods=["POST"])
 def cleanup_cache_endpoint():
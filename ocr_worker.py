@@ -0,0 +1,81 @@
+"""OCR worker functions for SciCheck Agent.
+
+Runs inside the OCR process pool (see get_ocr_pool in db.py). Kept free of app imports so
+pool processes started with forkserver/spawn load only PIL and pytesseract, not the Flask app.
+"""
+import pytesseract
+from PIL import Image, ImageOps
+
+OCR_DPI = 300                       # resolution tesseract is told the rescaled image has
+OCR_MIN_SIDE = 1200                 # upscale small images until the long side reaches this
+OCR_MAX_SIDE = 3000                 # downscale huge photos/screenshots to this long side
+OCR_ROTATION_MIN_CONFIDENCE = 2.0
+OCR_DEFAULT_PSM = 3                 # fully automatic page segmentation
+OCR_DEFAULT_OEM = 3                 # default engine (LSTM where available)
+
+def otsu_threshold(image):
+    """Otsu's global threshold for a grayscale PIL image"""
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(level * count for level, count in enumerate(histogram))
+    sum_background = weight_background = 0
+    best_threshold, best_variance = 127, 0.0
+    for level, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += level * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = level, variance
+    return best_threshold
+
+def preprocess_image_for_ocr(image_path):
+    """Load an image upright, grayscale, rescaled to an OCR-friendly size and binarized"""
+    image = Image.open(image_path)
+    long_side = max(image.size)
+    target_long_side = min(max(long_side, OCR_MIN_SIDE), OCR_MAX_SIDE, long_side * 3)
+    if target_long_side < long_side:
+        # JPEGs can decode straight at a reduced size
+        ratio = target_long_side / long_side
+        image.draft("L", (round(image.size[0] * ratio), round(image.size[1] * ratio)))
+    image = ImageOps.exif_transpose(image).convert("L")
+    factor = target_long_side / max(image.size)
+    if abs(factor - 1) > 0.01:
+        image = image.resize((max(1, round(image.size[0] * factor)), max(1, round(image.size[1] * factor))),
+                             Image.LANCZOS)
+    image = ImageOps.autocontrast(image)
+    threshold = otsu_threshold(image)
+    image = image.point(lambda level: 255 if level > threshold else 0)
+    histogram = image.histogram()
+    if histogram[0] > histogram[255]:
+        image = ImageOps.invert(image)  # dark-mode screenshots: make the background white
+    return image
+
+def correct_rotation(image):
+    """Rotate an image upright using tesseract's orientation detection, when it is confident"""
+    try:
+        osd = pytesseract.image_to_osd(image, config=f"--dpi {OCR_DPI}",
+                                       output_type=pytesseract.Output.DICT)
+    except pytesseract.TesseractError:
+        return image  # too little text to decide, or no OSD data installed
+    rotate = osd.get("rotate", 0)
+    if rotate and osd.get("orientation_conf", 0) >= OCR_ROTATION_MIN_CONFIDENCE:
+        return image.rotate(-rotate, expand=True, fillcolor=255)
+    return image
+
+def ocr_image_file(image_path, psm=OCR_DEFAULT_PSM, oem=OCR_DEFAULT_OEM):
+    """Worker entry point: preprocess an image file and return the recognized text"""
+    try:
+        image = correct_rotation(preprocess_image_for_ocr(image_path))
+        config = f"--oem {oem} --psm {psm} --dpi {OCR_DPI}"
+        return pytesseract.image_to_string(image, config=config).strip()
+    except pytesseract.TesseractNotFoundError as e:
+        # Its constructor takes no arguments, so it cannot be unpickled in the parent and would
+        # break the whole pool; send a plain exception instead
+        raise RuntimeError(str(e)) from None